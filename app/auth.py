@@ -9,10 +9,10 @@ from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 
-from pwdlib import PasswordHash
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+import asyncio
 import os
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
@@ -22,6 +22,9 @@ from pydantic import BaseModel
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
 from app.db import SessionDep
+from app.cache import TTLCache
+from app.config import settings
+from app.hashing import HashingBusyError, hashing_executor, password_hash
 
 
 router = APIRouter()
@@ -57,28 +60,50 @@ class UserCreate(User):
 
 
 
-password_hash = PasswordHash.recommended()
+def password_hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins at once, try again",
+        headers={"Retry-After": "1"}
+    )
 
-def verify_password(plain_password, hashed_password):
-    return password_hash.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password) -> tuple[bool, str | None]:
+    # returns (valid, updated_hash); updated_hash is set when the Argon2 parameters changed
+    try:
+        future = hashing_executor.submit(password_hash.verify_and_update, plain_password, hashed_password)
+    except HashingBusyError:
+        raise password_hashing_busy()
+    return await asyncio.wrap_future(future)
 
 def get_password_hash(password):
-    return password_hash.hash(password)
+    # only called from sync routes (threadpool), so waiting for the result is fine
+    try:
+        future = hashing_executor.submit(password_hash.hash, password)
+    except HashingBusyError:
+        raise password_hashing_busy()
+    return future.result()
 
 @router.post("/users", response_model=User)
 def create_user(user: UserCreate, session: SessionDep):
+    potentially_existing_db_user = session.get(UserInDB, user.username)
+    if potentially_existing_db_user:
+        raise HTTPException(status_code=409, detail="Username already taken")
     db_user = UserInDB(
         **user.model_dump(),
         hashed_password=get_password_hash(user.plain_password)
     )
-    potentially_existing_db_user = session.get(UserInDB, user.username)
-    if potentially_existing_db_user:
-        raise HTTPException(status_code=409, detail="Username already taken")
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    invalidate_user(user.username)
     return user
 
+# username -> User, saves the user lookup on every authenticated request
+user_cache = TTLCache(maxsize=settings.user_cache_maxsize, ttl=settings.user_cache_ttl_seconds)
+
+def invalidate_user(username: str):
+    user_cache.pop(username)
+
 def get_user(username: str, session: SessionDep):
     user_db = session.get(UserInDB, username)
     if not user_db:
@@ -86,12 +111,19 @@ def get_user(username: str, session: SessionDep):
     user = user_db.model_dump(exclude={"hashed_password"})
     return user
 
-def authenticate_user(username: str, password: str, session: SessionDep):
+async def authenticate_user(username: str, password: str, session: SessionDep):
     user_in_db = session.get(UserInDB, username)
     if not user_in_db:
         return False
-    if not verify_password(password, user_in_db.hashed_password):
+    valid, updated_hash = await verify_password(password, user_in_db.hashed_password)
+    if not valid:
         return False
+    if updated_hash:
+        # hash was created with other Argon2 parameters, store the upgraded one
+        user_in_db.hashed_password = updated_hash
+        session.add(user_in_db)
+        session.commit()
+        session.refresh(user_in_db)
     return user_in_db
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -120,15 +152,19 @@ async def get_current_user(token: OAuth2SchemeDI, session: SessionDep):
         token_data = TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
+    user = user_cache.get(token_data.username)
+    if user is not None:
+        return user
     user = get_user(username=token_data.username, session=session)
     if user is None:
         raise credentials_exception
+    user = User.model_validate(user)
+    user_cache.set(token_data.username, user)
     return user
 
 CurrentUserDI = Annotated[User, Depends(get_current_user)]
 
 async def get_current_active_user(current_user: CurrentUserDI):
-    current_user = User.model_validate(current_user)
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -139,7 +175,7 @@ OAuth2PasswordRequestFormDI = Annotated[OAuth2PasswordRequestForm, Depends()]
 
 @router.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestFormDI, session: SessionDep):
-    user = authenticate_user(form_data.username, form_data.password, session)
+    user = await authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,107 @@
+import argparse
+import hashlib
+import re
+import unicodedata
+
+from sqlalchemy import tuple_, update
+from sqlmodel import Session as DBSession, delete, select
+
+from app.db import SessionDep, dialect_insert, engine
+from app.models import TextFeedback
+from app.models.text_feedback import TextFeedbackCluster
+
+# Collapses repeated text feedback ("too fast", "Too fast!!", "too   fast")
+# into one cluster per session. The comment is normalized (case, accents,
+# punctuation, whitespace, stretched letters) and hashed; comments with the same
+# fingerprint share a TextFeedbackCluster row that counts them. The raw rows
+# are kept and point to their cluster through cluster_id.
+
+def normalize_text(content: str) -> str:
+    text = unicodedata.normalize("NFKD", content.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"(\w)\1{2,}", r"\1\1", text) # soooo -> soo
+    normalized = " ".join(re.findall(r"\w+", text))
+    # nothing but punctuation/emoji: group identical strings at least
+    return normalized or " ".join(content.split())
+
+def fingerprint(content: str) -> str:
+    return hashlib.blake2b(normalize_text(content).encode(), digest_size=16).hexdigest()
+
+def apply_text_feedback_clusters(session: SessionDep, rows: list[dict]) -> list[dict]:
+    # upsert the clusters of a batch of new TextFeedback rows (before inserting
+    # them) and return the rows with their cluster_id, caller commits
+    if not rows:
+        return rows
+    keys = [(row["session_id"], fingerprint(row["content"])) for row in rows]
+    clusters: dict[tuple[int, str], dict] = {}
+    for key, row in zip(keys, rows):
+        cluster = clusters.get(key)
+        if cluster is None:
+            clusters[key] = {
+                "session_id": key[0],
+                "fingerprint": key[1],
+                "content": row["content"],
+                "count": 1,
+                "first_seen": row["timestamp"],
+                "last_seen": row["timestamp"],
+            }
+        else:
+            cluster["count"] += 1
+            cluster["last_seen"] = max(cluster["last_seen"], row["timestamp"])
+
+    statement = dialect_insert(session, TextFeedbackCluster)
+    table = TextFeedbackCluster.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=["session_id", "fingerprint"],
+        set_={
+            "count": table.c.count + statement.excluded["count"],
+            "last_seen": statement.excluded.last_seen,
+        }
+    )
+    # sorted so concurrent transactions lock cluster rows in the same order
+    session.execute(statement, [clusters[key] for key in sorted(clusters)])
+
+    cluster_ids = dict(
+        ((session_id, cluster_fingerprint), cluster_id)
+        for cluster_id, session_id, cluster_fingerprint in session.exec(
+            select(TextFeedbackCluster.id, TextFeedbackCluster.session_id, TextFeedbackCluster.fingerprint)
+            .where(tuple_(TextFeedbackCluster.session_id, TextFeedbackCluster.fingerprint).in_(list(clusters)))
+        )
+    )
+    return [{**row, "cluster_id": cluster_ids[key]} for key, row in zip(keys, rows)]
+
+def rebuild_clusters(session: SessionDep, session_id: int | None = None):
+    # recompute the clusters from the raw rows, e.g. for rows stored before
+    # clustering existed or after changing normalize_text
+    feedback = select(TextFeedback.id, TextFeedback.session_id, TextFeedback.content, TextFeedback.timestamp)
+    reset = update(TextFeedback).values(cluster_id=None)
+    clear = delete(TextFeedbackCluster)
+    if session_id is not None:
+        feedback = feedback.where(TextFeedback.session_id == session_id)
+        reset = reset.where(TextFeedback.session_id == session_id)
+        clear = clear.where(TextFeedbackCluster.session_id == session_id)
+    session.execute(reset)
+    session.execute(clear)
+
+    rows = [
+        {"id": feedback_id, "session_id": feedback_session_id, "content": content, "timestamp": timestamp}
+        for feedback_id, feedback_session_id, content, timestamp in session.exec(feedback.order_by(TextFeedback.id))
+    ]
+    for start in range(0, len(rows), 1000):
+        clustered = apply_text_feedback_clusters(session, rows[start:start + 1000])
+        session.execute(
+            update(TextFeedback),
+            [{"id": row["id"], "cluster_id": row["cluster_id"]} for row in clustered]
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the text feedback clusters")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--session-id", type=int, default=None, help="only rebuild this lecture session")
+    args = parser.parse_args()
+
+    with DBSession(engine) as session:
+        rebuild_clusters(session, args.session_id)
+        session.commit()
+    print("text feedback clusters rebuilt" + (f" for session {args.session_id}" if args.session_id else ""))
@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+LOCAL_POSTGRESQL_URL = "postgresql://jonathan@localhost:5432/mydb"
+
+
+class Settings(BaseSettings):
+    # every field can be overridden by the environment variable of the same name
+    # (case-insensitive), e.g. DB_POOL_SIZE=20
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url_internal: str = LOCAL_POSTGRESQL_URL
+
+    # connection pools (the sync and the async engine each have their own)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_async_pool_size: int = 10
+    db_async_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int | None = 15000
+    db_application_name: str = "swipeback-backend"
+    db_echo: bool = False
+    # run pending migrations at startup instead of only reporting them
+    db_auto_migrate: bool = False
+
+    # authenticated users are cached this long, so disabling a user takes
+    # effect after at most user_cache_ttl_seconds
+    user_cache_ttl_seconds: float = 30
+    user_cache_maxsize: int = 1024
+
+    # password hashing (Argon2 parameters of new hashes; existing hashes are
+    # upgraded on the next successful login)
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536
+    argon2_parallelism: int = 4
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+
+    # join code cache
+    join_code_cache_ttl_seconds: float = 30
+    join_code_cache_maxsize: int = 4096
+
+    # live results websocket
+    live_max_updates_per_second: float = 2
+    live_max_queue: int = 100
+
+    # feedback ingestion ("direct" or "buffered")
+    ingest_mode: str = "direct"
+    ingest_batch_size: int = 500
+    ingest_flush_interval_seconds: float = 0.5
+    ingest_max_queue: int = 50000
+    # a row that still can't be written after this many flushes (database away) is dropped
+    ingest_max_attempts: int = 20
+
+    # client nonces of accepted submissions remembered in memory (idempotent retries)
+    idempotency_window_seconds: float = 600
+    idempotency_window_maxsize: int = 100000
+
+    # request/SQL metrics on GET /metrics, X-DB-Query-Count / X-DB-Time-Ms response headers
+    metrics_enabled: bool = True
+    debug_query_headers: bool = False
+
+    # token bucket per join code and client for the anonymous feedback endpoints
+    # (off by default: without device tokens a class behind one NAT shares a bucket)
+    rate_limit_enabled: bool = False
+    rate_limit_per_second: float = 2
+    rate_limit_burst: int = 20
+    # clients with device tokens: per device as above, per address + User-Agent up to this
+    rate_limit_address_per_second: float = 10
+    rate_limit_address_burst: int = 100
+    rate_limit_maxsize: int = 100000
+    # "memory" or "package.module:factory" returning a shared RateLimitBackend
+    rate_limit_backend: str = "memory"
+    # take the client address from X-Forwarded-For (only behind a trusted proxy)
+    rate_limit_trust_forwarded_for: bool = False
+
+    # background housekeeping: active sessions without feedback for
+    # session_idle_timeout_minutes are ended (0 turns the expiry off)
+    housekeeping_enabled: bool = True
+    housekeeping_interval_seconds: float = 60
+    session_idle_timeout_minutes: float = 180
+    # at most this many sessions ended / cache entries checked per tick
+    housekeeping_batch_size: int = 20
+    housekeeping_prune_limit: int = 5000
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
@@ -14,6 +14,7 @@ from pwdlib import PasswordHash
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 import os
+import time
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 
@@ -21,20 +22,171 @@ from pydantic import BaseModel
 
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
-db_url = os.environ.get("DATABASE_URL_INTERNAL") 
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-LOCAL_POSTGRESQL_URL = "postgresql://jonathan@localhost:5432/mydb"
+from app.config import Settings, settings
+from app.metrics import record_query
 
-if not db_url:
-    db_url = LOCAL_POSTGRESQL_URL
+db_url = settings.database_url_internal
 
-engine = create_engine(url=db_url)
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that records how long callers wait for a connection,
+    # so the pool can be sized from data (see GET /stats/pool)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def recreate(self):
+        # keep the counters when the pool is recreated (e.g. engine.dispose())
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.checkout_timeouts = self.checkout_timeouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def create_db_engine(settings: Settings) -> Engine:
+    url = make_url(settings.database_url_internal)
+    if url.get_backend_name() == "sqlite":
+        # sqlite has no server side pool or session parameters to tune
+        return create_engine(url=url, echo=settings.db_echo)
+
+    connect_args = {"application_name": settings.db_application_name}
+    if settings.db_statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    return create_engine(
+        url=url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args
+    )
+
+
+def create_async_db_engine(settings: Settings) -> AsyncEngine:
+    # same database through an asyncio driver (asyncpg / aiosqlite)
+    url = make_url(settings.database_url_internal)
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url.set(drivername="sqlite+aiosqlite"), echo=settings.db_echo)
+
+    server_settings = {"application_name": settings.db_application_name}
+    if settings.db_statement_timeout_ms:
+        server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+
+    return create_async_engine(
+        url.set(drivername="postgresql+asyncpg"),
+        echo=settings.db_echo,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.db_async_pool_size,
+        max_overflow=settings.db_async_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={"server_settings": server_settings}
+    )
+
+
+def instrument_engine(engine: Engine):
+    # count and time every statement for GET /metrics (see app/metrics.py)
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started", None)
+        if started is None:
+            return
+        record_query(time.perf_counter() - started)
+
+
+engine = create_db_engine(settings)
+async_engine = create_async_db_engine(settings)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+
+def get_engine_pool_stats(engine: Engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.checkout_timeouts,
+            "wait_seconds_total": pool.wait_seconds_total,
+            "wait_seconds_max": pool.wait_seconds_max,
+            "wait_seconds_avg": pool.wait_seconds_total / pool.checkouts if pool.checkouts else None,
+        })
+    return stats
+
+def get_pool_stats() -> dict:
+    return {
+        "sync": get_engine_pool_stats(engine),
+        "async": get_engine_pool_stats(async_engine.sync_engine),
+    }
+
+def dialect_insert(session: Session, model: type[SQLModel]):
+    # INSERT construct with on_conflict_do_update/on_conflict_do_nothing for the
+    # dialect the session is bound to (Postgres in production, SQLite locally)
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql_insert(model)
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"upserts are not implemented for {dialect}")
 
 def get_session():
     with Session(engine) as session:
         yield session
 
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+
+# async counterpart for the student facing hot paths, the rest stays on SessionDep
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
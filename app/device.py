@@ -0,0 +1,44 @@
+from datetime import timedelta
+from uuid import uuid4
+
+import jwt
+from fastapi import HTTPException, status
+from jwt.exceptions import InvalidTokenError
+from pydantic import BaseModel
+
+from app.auth import ALGORITHM, SECRET_KEY, create_access_token
+
+# Anonymous device tokens: a student's browser gets one when joining a session
+# and sends it with every answer (X-Device-Token), so each device has a single
+# answer per question that is updated instead of appended. The token only
+# carries a random device id and the session; it has no "sub" and is therefore
+# never accepted as a login.
+
+DEVICE_TOKEN_EXPIRE_HOURS = 24
+
+
+class DeviceToken(BaseModel):
+    device_token: str
+    expires_in: int
+
+
+def create_device_token(session_id: int) -> DeviceToken:
+    expires = timedelta(hours=DEVICE_TOKEN_EXPIRE_HOURS)
+    token = create_access_token({"device": uuid4().hex, "session_id": session_id}, expires_delta=expires)
+    return DeviceToken(device_token=token, expires_in=int(expires.total_seconds()))
+
+
+def decode_device_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return {}
+    return payload if payload.get("device") else {}
+
+
+def get_device_id(token: str, session_id: int) -> str:
+    payload = decode_device_token(token)
+    device = payload.get("device")
+    if not device or payload.get("session_id") != session_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid device token")
+    return device
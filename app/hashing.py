@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from app.config import settings
+
+# Argon2 is deliberately slow and memory hungry. Hashing and verification run
+# on a small dedicated thread pool (argon2-cffi releases the GIL) instead of the
+# event loop or the request threadpool, and at most password_hash_max_pending
+# jobs may wait for it; everything beyond that is rejected with a 503.
+password_hash = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.argon2_time_cost,
+        memory_cost=settings.argon2_memory_cost,
+        parallelism=settings.argon2_parallelism
+    ),
+))
+
+
+class HashingBusyError(Exception):
+    pass
+
+
+class HashingExecutor:
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusyError()
+        submitted = time.perf_counter()
+        try:
+            return self._executor.submit(self._run, submitted, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _run(self, submitted: float, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            self._slots.release()
+            with self._lock:
+                self.completed += 1
+                self.queue_seconds_total += started - submitted
+                self.queue_seconds_max = max(self.queue_seconds_max, started - submitted)
+                self.run_seconds_total += finished - started
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_seconds_total": self.queue_seconds_total,
+                "queue_seconds_max": self.queue_seconds_max,
+                "queue_seconds_avg": self.queue_seconds_total / self.completed if self.completed else None,
+                "run_seconds_avg": self.run_seconds_total / self.completed if self.completed else None,
+            }
+
+
+hashing_executor = HashingExecutor(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending
+)
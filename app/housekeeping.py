@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists
+from sqlmodel import Session as DBSession, select
+
+from app.auth import user_cache
+from app.config import settings
+from app.db import SessionDep, engine
+from app.idempotency import submission_window
+from app.ingest import feedback_buffer
+from app.join_code import bootstrap_cache, join_code_cache
+from app.models import Metric, MetricValue, Question, QuestionResponse, Session, TextFeedback
+from app.models.slider import SliderValue
+from app.ratelimit import address_rate_limiter, feedback_rate_limiter
+from app.summary import close_session
+
+logger = logging.getLogger(__name__)
+
+# Background housekeeping, started from the lifespan in app/main.py. Every
+# HOUSEKEEPING_INTERVAL_SECONDS it
+#   - ends active sessions that got no feedback for SESSION_IDLE_TIMEOUT_MINUTES
+#     (same as POST /sessions/{id}/end: summary snapshot, join code released),
+#   - drops expired entries from the in-memory caches and full rate limit buckets.
+# Both are bounded per tick (HOUSEKEEPING_BATCH_SIZE sessions,
+# HOUSEKEEPING_PRUNE_LIMIT entries per cache), whatever is left waits for the next tick.
+# The work runs in a worker thread on the sync engine so the event loop is never blocked.
+
+def idle_session_statement(cutoff: datetime, skip: list[int]):
+    # oldest active session started before cutoff without any feedback since then
+    recent_metric_values = exists().where(
+        Metric.session_id == Session.id,
+        MetricValue.metric_id == Metric.id,
+        MetricValue.timestamp >= cutoff
+    )
+    recent_slider_values = exists().where(
+        SliderValue.session_id == Session.id,
+        SliderValue.timestamp >= cutoff
+    )
+    recent_question_responses = exists().where(
+        Question.session_id == Session.id,
+        QuestionResponse.question_id == Question.id,
+        QuestionResponse.timestamp >= cutoff
+    )
+    recent_text_feedback = exists().where(
+        TextFeedback.session_id == Session.id,
+        TextFeedback.timestamp >= cutoff
+    )
+    return (
+        select(Session)
+        .where(
+            Session.is_active == True,
+            Session.start_time < cutoff,
+            Session.id.not_in(skip),
+            ~recent_metric_values,
+            ~recent_slider_values,
+            ~recent_question_responses,
+            ~recent_text_feedback
+        )
+        .order_by(Session.start_time, Session.id)
+        .limit(1)
+        # several workers run this at once, each takes a different session (ignored by sqlite)
+        .with_for_update(of=Session, skip_locked=True)
+    )
+
+def expire_idle_sessions(
+    session: SessionDep, idle_timeout: timedelta, limit: int, stopping=lambda: False
+) -> tuple[list[int], list[int]]:
+    # returns the ids of the sessions that were ended and of those that failed
+    if feedback_buffer.enabled:
+        # queued feedback counts as activity, it has to be in the tables first
+        feedback_buffer.flush()
+    cutoff = datetime.utcnow() - idle_timeout
+    ended = []
+    failed = []
+    # one session per transaction, close_session commits and releases the row lock
+    while len(ended) + len(failed) < limit and not stopping():
+        db_session = session.exec(idle_session_statement(cutoff, failed)).first()
+        if db_session is None:
+            break
+        session_id = db_session.id
+        try:
+            close_session(session, db_session)
+        except Exception:
+            # one broken session must not keep the others from being ended
+            logger.exception("ending idle session %d failed", session_id)
+            session.rollback()
+            failed.append(session_id)
+            continue
+        ended.append(session_id)
+        logger.info("ended session %d after %s without feedback", session_id, idle_timeout)
+    return ended, failed
+
+def prune_caches(limit: int) -> dict[str, int]:
+    return {
+        "join_code": join_code_cache.prune(limit),
+        "bootstrap": bootstrap_cache.prune(limit),
+        "user": user_cache.prune(limit),
+        "idempotency": submission_window.prune(limit),
+        "ratelimit": feedback_rate_limiter.prune(limit) + address_rate_limiter.prune(limit),
+    }
+
+
+class Housekeeper:
+
+    def __init__(self, interval: float, idle_timeout_minutes: float, batch_size: int, prune_limit: int):
+        self.interval = interval
+        self.idle_timeout = timedelta(minutes=idle_timeout_minutes) if idle_timeout_minutes else None
+        self.batch_size = batch_size
+        self.prune_limit = prune_limit
+        self.ticks = 0
+        self.failed_ticks = 0
+        self.sessions_ended = 0
+        self.sessions_failed = 0
+        self.pruned: dict[str, int] = {}
+        self.last_tick_at: datetime | None = None
+        self.last_tick_seconds: float | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="housekeeping")
+
+    async def stop(self):
+        # a tick that is running finishes the session it is closing, then returns
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def run_once(self):
+        started = time.perf_counter()
+        if self.idle_timeout is not None:
+            with DBSession(engine) as session:
+                ended, failed = expire_idle_sessions(
+                    session, self.idle_timeout, self.batch_size, stopping=lambda: self._stopping
+                )
+            self.sessions_ended += len(ended)
+            self.sessions_failed += len(failed)
+        for name, count in prune_caches(self.prune_limit).items():
+            self.pruned[name] = self.pruned.get(name, 0) + count
+        self.ticks += 1
+        self.last_tick_at = datetime.utcnow()
+        self.last_tick_seconds = time.perf_counter() - started
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                return
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                # the database may be away for a moment, try again next tick
+                logger.exception("housekeeping tick failed")
+                self.failed_ticks += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "session_idle_timeout_minutes": self.idle_timeout.total_seconds() / 60 if self.idle_timeout else None,
+            "batch_size": self.batch_size,
+            "prune_limit": self.prune_limit,
+            "ticks": self.ticks,
+            "failed_ticks": self.failed_ticks,
+            "sessions_ended": self.sessions_ended,
+            "sessions_failed": self.sessions_failed,
+            "pruned": self.pruned,
+            "last_tick_at": self.last_tick_at,
+            "last_tick_seconds": self.last_tick_seconds,
+        }
+
+
+housekeeper = Housekeeper(
+    interval=settings.housekeeping_interval_seconds,
+    idle_timeout_minutes=settings.session_idle_timeout_minutes,
+    batch_size=settings.housekeeping_batch_size,
+    prune_limit=settings.housekeeping_prune_limit
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End idle lecture sessions")
+    parser.add_argument("command", choices=["expire"])
+    parser.add_argument("--idle-minutes", type=float, default=settings.session_idle_timeout_minutes)
+    parser.add_argument("--limit", type=int, default=1000, help="end at most this many sessions")
+    args = parser.parse_args()
+
+    with DBSession(engine) as session:
+        ended, failed = expire_idle_sessions(session, timedelta(minutes=args.idle_minutes), args.limit)
+    print(f"ended {len(ended)} idle sessions" + (f": {', '.join(map(str, ended))}" if ended else ""))
+    if failed:
+        print(f"failed to end {len(failed)} sessions: {', '.join(map(str, failed))}")
@@ -0,0 +1,33 @@
+from fastapi import Header
+
+from app.cache import TTLCache
+from app.config import settings
+
+# Students' phones retry submissions on flaky Wi-Fi. A client can send a nonce
+# (client_nonce in the body or an Idempotency-Key header) with a submission;
+# nonces seen in the last IDEMPOTENCY_WINDOW_SECONDS are answered without
+# touching the database. Retries that miss the window (other worker, restart,
+# eviction) hit the unique (item id, client_nonce) index and are skipped by
+# ON CONFLICT DO NOTHING in app.ingest.write_rows.
+
+submission_window = TTLCache(
+    maxsize=settings.idempotency_window_maxsize,
+    ttl=settings.idempotency_window_seconds
+)
+
+
+def claim_submission(kind: str, item_id: int, nonce: str | None) -> bool:
+    # False if the same submission was already accepted within the window
+    if nonce is None:
+        return True
+    return submission_window.add((kind, item_id, nonce), True)
+
+
+def release_submission(kind: str, item_id: int, nonce: str | None):
+    # storing failed, a retry has to go through again
+    if nonce is not None:
+        submission_window.pop((kind, item_id, nonce))
+
+
+def idempotency_key(idempotency_key: str | None = Header(default=None, max_length=64)) -> str | None:
+    return idempotency_key
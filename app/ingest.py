@@ -0,0 +1,296 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlmodel import Session, SQLModel
+
+from app.config import settings
+from app.db import SessionDep, AsyncSessionDep, dialect_insert, engine
+from app.models import MetricValue, QuestionResponse, TextFeedback
+from app.models.slider import SliderValue
+from app.clustering import apply_text_feedback_clusters
+from app.live import live_results
+from app.rollup import apply_metric_values, apply_question_counts, apply_question_responses
+
+logger = logging.getLogger(__name__)
+
+# INGEST_MODE=buffered turns on write-behind ingestion for student feedback:
+# the request is validated, the row is queued in memory and a background thread
+# bulk-inserts the queue every INGEST_FLUSH_INTERVAL_SECONDS or as soon as
+# INGEST_BATCH_SIZE rows are waiting. Rows still queued when the process dies
+# without a clean shutdown are lost, which is why this is opt-in.
+#
+# A batch that fails because of its data (e.g. the metric of a queued value was
+# deleted) is written again model by model and then row by row, and only the rows
+# that still fail are dropped with a log entry. When the database itself is away
+# the batch is queued again, at most INGEST_MAX_ATTEMPTS times per row.
+
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+# conflict target of the feedback that carries a client nonce (see app/idempotency.py)
+IDEMPOTENT_INSERTS = {
+    MetricValue: ["metric_id", "client_nonce"],
+    QuestionResponse: ["question_id", "client_nonce"],
+    SliderValue: ["slider_id", "client_nonce"],
+}
+
+
+def upsert_device_answers(session: SessionDep, rows: list[dict]) -> list[dict]:
+    # one answer per question and device: a first answer counts, a changed answer
+    # moves from one tally to the other, repeating the answer changes nothing.
+    # returns the rows that were inserted or changed
+    latest = {}
+    for row in rows:
+        # a flushed batch can hold several taps of one device, the last one wins
+        latest[(row["question_id"], row["device_token"])] = {**row, "client_nonce": None}
+    table = QuestionResponse.__table__
+    statement = dialect_insert(session, QuestionResponse)
+    statement = statement.on_conflict_do_update(
+        index_elements=["question_id", "device_token"],
+        set_={
+            "answer": statement.excluded.answer,
+            "timestamp": statement.excluded.timestamp,
+            "answer_changes": table.c.answer_changes + 1,
+        },
+        where=table.c.answer != statement.excluded.answer
+    )
+    result = session.execute(
+        statement.returning(QuestionResponse.question_id, QuestionResponse.answer, QuestionResponse.answer_changes),
+        [latest[key] for key in sorted(latest)]
+    )
+    written = [dict(row._mapping) for row in result]
+
+    counts = Counter()
+    for row in written:
+        counts[(row["question_id"], row["answer"])] += 1
+        if row["answer_changes"]:
+            counts[(row["question_id"], not row["answer"])] -= 1
+    apply_question_counts(session, counts)
+    return written
+
+
+def write_rows(session: SessionDep, model: type[SQLModel], rows: list[dict]) -> list[dict]:
+    # multi-row insert shared by the direct path and the flusher, caller commits;
+    # returns the rows that were inserted (retried submissions are skipped)
+    if model is TextFeedback:
+        rows = apply_text_feedback_clusters(session, rows)
+    if model is QuestionResponse and any(row.get("device_token") for row in rows):
+        written = upsert_device_answers(session, [row for row in rows if row.get("device_token")])
+        rows = [row for row in rows if not row.get("device_token")]
+        return written + (write_rows(session, model, rows) if rows else [])
+    if model in IDEMPOTENT_INSERTS:
+        statement = dialect_insert(session, model).on_conflict_do_nothing(index_elements=IDEMPOTENT_INSERTS[model])
+        result = session.execute(statement.returning(*[getattr(model, name) for name in rows[0]]), rows)
+        rows = [dict(row._mapping) for row in result]
+    else:
+        session.execute(insert(model), rows)
+    if model is MetricValue:
+        apply_metric_values(session, rows)
+    elif model is QuestionResponse:
+        apply_question_responses(session, rows)
+    return rows
+
+
+class FeedbackBuffer:
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int, max_attempts: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.enabled = False
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rejected_rows = 0
+        self.dropped_rows = 0
+        # (model, row, session_id of a question response whose live update waits for the flush,
+        # failed attempts)
+        self._queue: deque[tuple[type[SQLModel], dict, int | None, int]] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.enabled = True
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="feedback-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # stop accepting rows, then let the flusher drain everything that is queued
+        if self._thread is None:
+            return
+        self.enabled = False
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        if self._queue:
+            logger.error("dropping %d queued feedback rows on shutdown", len(self._queue))
+
+    def put(self, model: type[SQLModel], row: dict, session_id: int | None = None) -> bool:
+        # returns False when buffering is off or the queue is full, the caller
+        # then writes the row itself
+        if not self.enabled:
+            return False
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self.rejected_rows += 1
+                return False
+            self._queue.append((model, row, session_id, 0))
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def flush(self) -> int:
+        # one flush at a time: a caller that needs everything written (closing a
+        # session) also waits for the batch the flusher thread is writing right now
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        written = 0
+        while True:
+            with self._condition:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return written
+
+            question_sessions = {
+                row["question_id"]: session_id for model, row, session_id, _ in batch if session_id is not None
+            }
+            dropped = self.dropped_rows
+            with ExitStack() as stack:
+                for session_id in set(question_sessions.values()):
+                    stack.enter_context(live_results.writing(session_id))
+                written_rows, retry = self._write_batch(batch)
+
+                # whether a device answer is new, changed or a repeat is only known after the upsert
+                for row in written_rows.get(QuestionResponse, []):
+                    session_id = question_sessions.get(row["question_id"])
+                    if session_id is not None:
+                        live_results.publish_question_response(
+                            session_id, row["question_id"], row["answer"], changed=bool(row.get("answer_changes"))
+                        )
+            dropped = self.dropped_rows - dropped
+
+            written += len(batch) - len(retry)
+            self.flushes += 1
+            self.flushed_rows += len(batch) - len(retry) - dropped
+            if retry:
+                # the database is away: keep the rows for the next tick
+                self.failed_flushes += 1
+                self._requeue(retry)
+                return written
+
+    def _write_batch(self, batch: list) -> tuple[dict[type[SQLModel], list[dict]], list]:
+        # returns the written rows per model and the items to retry later
+        written: dict[type[SQLModel], list[dict]] = {}
+        retry = []
+        # groups still to write, each in its own transaction
+        pending = [batch]
+        while pending:
+            group = pending.pop(0)
+            if retry:
+                retry.extend(group)
+                continue
+            try:
+                with Session(engine) as session:
+                    rows_by_model: dict[type[SQLModel], list[dict]] = {}
+                    for model, row, _, _ in group:
+                        rows_by_model.setdefault(model, []).append(row)
+                    for model, rows in rows_by_model.items():
+                        written.setdefault(model, []).extend(write_rows(session, model, rows))
+                    session.commit()
+            except TRANSIENT_ERRORS:
+                logger.exception("flushing %d feedback rows failed", len(group))
+                retry.extend(group)
+            except Exception:
+                if len(group) == 1:
+                    model, row, _, _ = group[0]
+                    logger.exception("dropping %s row that can't be written: %r", model.__name__, row)
+                    self.dropped_rows += 1
+                    continue
+                models = list(dict.fromkeys(model for model, _, _, _ in group))
+                if len(models) > 1:
+                    pending[:0] = [[item for item in group if item[0] is model] for model in models]
+                else:
+                    pending[:0] = [[item] for item in group]
+                logger.warning("flushing %d feedback rows failed, writing them in smaller parts", len(group))
+        return written, retry
+
+    def _requeue(self, items: list):
+        keep = []
+        for model, row, session_id, attempts in items:
+            if attempts + 1 >= self.max_attempts:
+                logger.error("dropping %s row after %d failed flushes: %r", model.__name__, attempts + 1, row)
+                self.dropped_rows += 1
+            else:
+                keep.append((model, row, session_id, attempts + 1))
+        with self._condition:
+            self._queue.extendleft(reversed(keep))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._condition.wait(timeout=self.flush_interval)
+                stopping = self._stopping
+            if stopping:
+                return
+            if self.flush() == 0 and self._queue:
+                # the database is failing, don't spin
+                time.sleep(self.flush_interval)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queue),
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "rejected_rows": self.rejected_rows,
+            "dropped_rows": self.dropped_rows,
+        }
+
+
+feedback_buffer = FeedbackBuffer(
+    batch_size=settings.ingest_batch_size,
+    flush_interval=settings.ingest_flush_interval_seconds,
+    max_queue=settings.ingest_max_queue,
+    max_attempts=settings.ingest_max_attempts
+)
+
+
+# both return what write_rows wrote, empty when the row was a retry the database
+# already has; a queued row is returned as is, unless it is a question response
+# queued with its session_id: the flusher publishes those to the live results
+# once written, and nothing is returned
+
+def store_feedback(session: SessionDep, model: type[SQLModel], row: dict, session_id: int | None = None) -> list[dict]:
+    if feedback_buffer.put(model, row, session_id):
+        return [] if session_id is not None else [row]
+    written = write_rows(session, model, [row])
+    session.commit()
+    return written
+
+
+async def store_feedback_async(session: AsyncSessionDep, model: type[SQLModel], row: dict, session_id: int | None = None) -> list[dict]:
+    if feedback_buffer.put(model, row, session_id):
+        return [] if session_id is not None else [row]
+    written = await session.run_sync(write_rows, model, [row])
+    await session.commit()
+    return written
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+
+from sqlmodel import select
+
+from app.cache import TTLCache
+from app.config import settings
+from app.db import SessionDep, AsyncSessionDep
+from app.models import Session, Metric, Module, Question
+from app.models.join import JoinBootstrap, JoinSessionInfo
+from app.models.metric import MetricPublic
+from app.models.question import QuestionPublic
+from app.models.slider import Slider, SliderPublic
+
+# every student request starts by resolving its join code, so the result is
+# kept in memory for a short time. start/end of a session and new metrics or
+# questions invalidate the entry explicitly; the TTL bounds how long other
+# worker processes can see a stale entry.
+
+
+@dataclass(frozen=True)
+class JoinCodeEntry:
+    join_code: str
+    session_id: int
+    module_id: int
+    is_active: bool
+    metric_ids: frozenset[int]
+    question_ids: frozenset[int]
+    slider_ids: frozenset[int]
+
+
+@dataclass(frozen=True)
+class JoinBootstrapEntry:
+    session_id: int
+    module_id: int
+    etag: str
+    body: bytes # serialized JoinBootstrap
+
+
+join_code_cache = TTLCache(
+    maxsize=settings.join_code_cache_maxsize,
+    ttl=settings.join_code_cache_ttl_seconds
+)
+
+# GET /join/{code} responses, invalidated together with join_code_cache
+bootstrap_cache = TTLCache(
+    maxsize=settings.join_code_cache_maxsize,
+    ttl=settings.join_code_cache_ttl_seconds
+)
+# join code -> load in progress, so a class joining at once causes one load
+_bootstrap_loads: dict[str, asyncio.Future] = {}
+
+
+def load_join_code(session: SessionDep, join_code: str) -> JoinCodeEntry | None:
+    db_session = session.exec(select(Session).where(Session.join_code == join_code)).first()
+    if not db_session:
+        return None
+
+    metric_ids = session.exec(
+        select(Metric.id).where(Metric.session_id == db_session.id)
+    ).all()
+    question_ids = session.exec(
+        select(Question.id).where(Question.session_id == db_session.id)
+    ).all()
+    slider_ids = session.exec(
+        select(Slider.id).where(Slider.module_id == db_session.module_id)
+    ).all()
+
+    entry = JoinCodeEntry(
+        join_code=db_session.join_code,
+        session_id=db_session.id,
+        module_id=db_session.module_id,
+        is_active=db_session.is_active,
+        metric_ids=frozenset(metric_ids),
+        question_ids=frozenset(question_ids),
+        slider_ids=frozenset(slider_ids)
+    )
+    join_code_cache.set(join_code, entry)
+    return entry
+
+
+def resolve_join_code(join_code: str, session: SessionDep) -> JoinCodeEntry | None:
+    entry = join_code_cache.get(join_code)
+    if entry is not None:
+        return entry
+    return load_join_code(session, join_code)
+
+
+async def resolve_join_code_async(join_code: str, session: AsyncSessionDep) -> JoinCodeEntry | None:
+    entry = join_code_cache.get(join_code)
+    if entry is not None:
+        return entry
+    return await session.run_sync(load_join_code, join_code)
+
+
+def load_bootstrap(session: SessionDep, join_code: str) -> JoinBootstrapEntry | None:
+    row = session.exec(
+        select(Session, Module.title)
+        .join(Module, Module.id == Session.module_id)
+        .where(Session.join_code == join_code)
+    ).first()
+    if not row:
+        return None
+    db_session, module_title = row
+
+    sliders = session.exec(select(Slider).where(Slider.module_id == db_session.module_id).order_by(Slider.id)).all()
+    metrics = session.exec(select(Metric).where(Metric.session_id == db_session.id).order_by(Metric.id)).all()
+    questions = session.exec(select(Question).where(Question.session_id == db_session.id).order_by(Question.id)).all()
+
+    # the same rows answer the join code lookup of the submissions that follow
+    join_code_cache.set(join_code, JoinCodeEntry(
+        join_code=db_session.join_code,
+        session_id=db_session.id,
+        module_id=db_session.module_id,
+        is_active=db_session.is_active,
+        metric_ids=frozenset(metric.id for metric in metrics),
+        question_ids=frozenset(question.id for question in questions),
+        slider_ids=frozenset(slider.id for slider in sliders)
+    ))
+
+    body = JoinBootstrap(
+        session=JoinSessionInfo(
+            id=db_session.id,
+            module_id=db_session.module_id,
+            module_title=module_title,
+            is_active=db_session.is_active,
+            start_time=db_session.start_time
+        ),
+        sliders=[SliderPublic.model_validate(slider) for slider in sliders],
+        metrics=[MetricPublic.model_validate(metric) for metric in metrics],
+        questions=[QuestionPublic.model_validate(question) for question in questions]
+    ).model_dump_json().encode()
+    entry = JoinBootstrapEntry(
+        session_id=db_session.id,
+        module_id=db_session.module_id,
+        etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+        body=body
+    )
+    bootstrap_cache.set(join_code, entry)
+    return entry
+
+
+async def resolve_bootstrap_async(join_code: str, session: AsyncSessionDep) -> JoinBootstrapEntry | None:
+    entry = bootstrap_cache.get(join_code)
+    if entry is not None:
+        return entry
+    loading = _bootstrap_loads.get(join_code)
+    if loading is not None:
+        return await asyncio.shield(loading)
+
+    loading = asyncio.get_running_loop().create_future()
+    _bootstrap_loads[join_code] = loading
+    try:
+        entry = await session.run_sync(load_bootstrap, join_code)
+    except Exception as error:
+        loading.set_exception(error)
+        loading.exception() # mark as retrieved, the waiters raise it themselves
+        raise
+    except BaseException:
+        loading.cancel()
+        raise
+    else:
+        loading.set_result(entry)
+    finally:
+        del _bootstrap_loads[join_code]
+    return entry
+
+
+def invalidate_join_code(join_code: str):
+    join_code_cache.pop(join_code)
+    bootstrap_cache.pop(join_code)
+
+
+def invalidate_session(session_id: int):
+    join_code_cache.pop_where(lambda entry: entry.session_id == session_id)
+    bootstrap_cache.pop_where(lambda entry: entry.session_id == session_id)
+
+
+def invalidate_module(module_id: int):
+    # sliders and the module title are shared by all sessions of a module
+    join_code_cache.pop_where(lambda entry: entry.module_id == module_id)
+    bootstrap_cache.pop_where(lambda entry: entry.module_id == module_id)
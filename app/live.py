@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+from app.config import settings
+
+# In-process fan-out of feedback events to the professor dashboard.
+# Every accepted submission is folded into a pending delta of its session; the
+# delta is sent to the session's subscribers at most max_updates_per_second
+# times per second, so a burst of swipes costs one message per interval
+# instead of one results query per poll. Subscribers only see submissions
+# handled by the same worker process.
+#
+# Every event gets the next sequence number of its session; a delta carries the
+# number of its last event and a snapshot the number it was loaded at. The
+# submission endpoints wrap store + publish in writing(session_id). A snapshot
+# only counts as exact when no write of its session was in flight when it started
+# loading, none started and no event arrived until it was loaded (see
+# app/routers/live.py); otherwise the subscriber takes another one shortly.
+
+RESYNC = {"type": "resync"}
+
+
+class LiveSubscriber:
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue)
+        # False until the subscriber has its snapshot, everything before is in there
+        self.ready = False
+
+    def send(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # client is too slow: throw away the deltas and let it reload a snapshot
+            self.resync()
+
+    def resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+        # no deltas until the new snapshot is loaded
+        self.ready = False
+
+
+class LiveChannel:
+
+    def __init__(self):
+        self.subscribers: set[LiveSubscriber] = set()
+        self.pending: dict | None = None
+        # number of the last event applied / of writes started while subscribed
+        self.seq = 0
+        self.writes_started = 0
+        self.last_sent = 0.0
+        self.flush_scheduled = False
+
+
+def empty_delta() -> dict:
+    return {"type": "delta", "metrics": {}, "questions": {}, "text_feedback": 0}
+
+
+class LiveResults:
+
+    def __init__(self, max_updates_per_second: float, max_queue: int):
+        self.interval = 1 / max_updates_per_second
+        self.max_queue = max_queue
+        self.published = 0
+        self.sent = 0
+        self.resyncs = 0
+        self._channels: dict[int, LiveChannel] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # session id -> writes between their commit and their publish (any thread)
+        self._writes_in_flight: dict[int, int] = {}
+        self._writes_lock = threading.Lock()
+
+    @contextmanager
+    def writing(self, session_id: int):
+        with self._writes_lock:
+            self._writes_in_flight[session_id] = self._writes_in_flight.get(session_id, 0) + 1
+            channel = self._channels.get(session_id)
+            if channel is not None:
+                channel.writes_started += 1
+        try:
+            yield
+        finally:
+            with self._writes_lock:
+                count = self._writes_in_flight[session_id] - 1
+                if count:
+                    self._writes_in_flight[session_id] = count
+                else:
+                    del self._writes_in_flight[session_id]
+
+    def snapshot_marker(self, session_id: int) -> tuple[int, int] | None:
+        # None while a write of the session is in flight, a snapshot loaded now can't be exact
+        with self._writes_lock:
+            if session_id in self._writes_in_flight:
+                return None
+            channel = self._channels.get(session_id)
+            return (channel.seq, channel.writes_started) if channel else (0, 0)
+
+    def subscribe(self, session_id: int) -> LiveSubscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = LiveSubscriber(self.max_queue)
+        self._channels.setdefault(session_id, LiveChannel()).subscribers.add(subscriber)
+        return subscriber
+
+    def seq(self, session_id: int) -> int:
+        channel = self._channels.get(session_id)
+        return channel.seq if channel else 0
+
+    def snapshot_is_exact(self, session_id: int, marker: tuple[int, int] | None) -> bool:
+        # nothing was written or published since snapshot_marker
+        return marker is not None and self.snapshot_marker(session_id) == marker
+
+    def schedule_resync(self, session_id: int, subscriber: LiveSubscriber):
+        # the subscriber's snapshot may be off by the events that arrived while it
+        # loaded: replace it with a new one after the next delta interval
+        def resync():
+            channel = self._channels.get(session_id)
+            if channel is not None and subscriber in channel.subscribers:
+                subscriber.resync()
+                self.resyncs += 1
+        self._loop.call_later(self.interval, resync)
+
+    def mark_ready(self, session_id: int, subscriber: LiveSubscriber):
+        # call on the event loop once the subscriber's snapshot is loaded: the
+        # pending delta was already counted by that snapshot, so it goes to the
+        # other subscribers right away and the new one only gets later deltas
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        if channel.pending is not None:
+            delta = channel.pending
+            channel.pending = None
+            channel.last_sent = time.monotonic()
+            self._send(channel, delta)
+        subscriber.ready = True
+
+    def unsubscribe(self, session_id: int, subscriber: LiveSubscriber):
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            del self._channels[session_id]
+
+    def publish_metric_value(self, session_id: int, metric_id: int, value: int):
+        self._publish(session_id, self._add_metric_value, metric_id, value)
+
+    def publish_question_response(self, session_id: int, question_id: int, answer: bool, changed: bool = False):
+        # changed: a device switched its answer, it leaves the other tally
+        self._publish(session_id, self._add_question_response, question_id, answer, changed)
+
+    def publish_text_feedback(self, session_id: int):
+        self._publish(session_id, self._add_text_feedback)
+
+    def _publish(self, session_id: int, apply, *args):
+        # nobody is watching this session: nothing to do
+        if session_id not in self._channels or self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._apply(session_id, apply, *args)
+        else:
+            self._loop.call_soon_threadsafe(self._apply, session_id, apply, *args)
+
+    def _apply(self, session_id: int, apply, *args):
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        if channel.pending is None:
+            channel.pending = empty_delta()
+        apply(channel.pending, *args)
+        channel.seq += 1
+        channel.pending["seq"] = channel.seq
+        self.published += 1
+        if not channel.flush_scheduled:
+            channel.flush_scheduled = True
+            delay = max(0.0, channel.last_sent + self.interval - time.monotonic())
+            self._loop.call_later(delay, self._flush, session_id)
+
+    def _flush(self, session_id: int):
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        delta = channel.pending
+        channel.pending = None
+        channel.flush_scheduled = False
+        channel.last_sent = time.monotonic()
+        if delta is None:
+            return
+        self._send(channel, delta)
+
+    def _send(self, channel: LiveChannel, delta: dict):
+        for subscriber in channel.subscribers:
+            if subscriber.ready:
+                subscriber.send(delta)
+                self.sent += 1
+
+    @staticmethod
+    def _add_metric_value(delta: dict, metric_id: int, value: int):
+        metric = delta["metrics"].setdefault(metric_id, {"count": 0, "sum": 0, "histogram": {}})
+        metric["count"] += 1
+        metric["sum"] += value
+        metric["histogram"][value] = metric["histogram"].get(value, 0) + 1
+
+    @staticmethod
+    def _add_question_response(delta: dict, question_id: int, answer: bool, changed: bool):
+        question = delta["questions"].setdefault(question_id, {"yes_count": 0, "no_count": 0})
+        question["yes_count" if answer else "no_count"] += 1
+        if changed:
+            question["no_count" if answer else "yes_count"] -= 1
+
+    @staticmethod
+    def _add_text_feedback(delta: dict):
+        delta["text_feedback"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._channels),
+            "subscribers": sum(len(channel.subscribers) for channel in self._channels.values()),
+            "max_updates_per_second": 1 / self.interval,
+            "published_events": self.published,
+            "sent_messages": self.sent,
+            "resyncs": self.resyncs,
+        }
+
+
+live_results = LiveResults(
+    max_updates_per_second=settings.live_max_updates_per_second,
+    max_queue=settings.live_max_queue
+)
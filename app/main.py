@@ -19,8 +19,14 @@ from pymongo.server_api import ServerApi
 
 from pydantic import BaseModel
 
-from app.db import SessionDep, create_db_and_tables
+from app.db import SessionDep, async_engine
+from app.schema import prepare_database
 from app.auth import User, OAuth2SchemeDI, CurrentActiveUserDI, router as auth_router
+from app.config import settings
+from app.ingest import feedback_buffer
+from app.hashing import hashing_executor
+from app.metrics import RequestMetricsMiddleware
+from app.housekeeping import housekeeper
 
 
 from app.routers.hero import router as hero_router
@@ -32,6 +38,12 @@ from app.routers.question import router as question_router
 from app.routers.session import router as session_router
 from app.routers.text_feedback import router as text_feedback_router
 from app.routers.slider import router as slider_router
+from app.routers.slider_value import router as slider_value_router
+from app.routers.stats import router as stats_router
+from app.routers.live import router as live_router
+from app.routers.export import router as export_router
+from app.routers.join import router as join_router
+from app.routers.metrics import router as metrics_router
 
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
@@ -41,8 +53,18 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    prepare_database()
+    if settings.ingest_mode == "buffered":
+        feedback_buffer.start()
+    if settings.housekeeping_enabled:
+        housekeeper.start()
     yield
+    # before the buffer stops, ending a session flushes it
+    await housekeeper.stop()
+    # write everything that is still queued before the process exits
+    feedback_buffer.stop()
+    hashing_executor.shutdown()
+    await async_engine.dispose()
 
 db_uri = os.environ.get("MONGODB_URI")
 
@@ -66,6 +88,13 @@ app.include_router(question_router)
 app.include_router(session_router)
 app.include_router(text_feedback_router)
 app.include_router(slider_router)
+app.include_router(slider_value_router)
+app.include_router(stats_router)
+app.include_router(live_router)
+app.include_router(export_router)
+app.include_router(join_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
 
 
 # validated hero now also has an id generated by the database
@@ -84,6 +113,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware, debug_header=settings.debug_query_headers)
+
 @app.get("/users/me/", response_model=User)
 async def read_users_me(current_user: CurrentActiveUserDI):
     return current_user
@@ -0,0 +1,167 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from starlette.datastructures import MutableHeaders
+
+# Request and SQL accounting in Prometheus text format (GET /metrics).
+# RequestMetricsMiddleware opens a RequestStats per HTTP request in a context
+# variable; the engine hooks in app.db add every statement executed while
+# handling the request to it (the context is copied into the threadpool and
+# into AsyncSession.run_sync, so sync and async routes are both covered).
+# Statements from background work (ingest flusher, startup) only show up in
+# the db_* totals.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> (count per bucket, not cumulative; last one is +Inf), sum
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            counts, total = self._series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total[0]}")
+                lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements per request",
+    ("method", "route"), QUERY_BUCKETS
+)
+request_db_seconds = Counter(
+    "http_request_db_seconds_total", "Time spent executing SQL while handling requests",
+    ("method", "route")
+)
+db_queries = Counter("db_queries_total", "SQL statements executed by the process")
+db_query_seconds = Counter("db_query_seconds_total", "Time spent executing SQL statements")
+
+METRICS = [request_duration, request_queries, request_db_seconds, db_queries, db_query_seconds]
+
+
+def record_query(seconds: float):
+    # called by the engine hooks for every statement
+    db_queries.inc()
+    db_query_seconds.inc(amount=seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    # plain ASGI middleware: measures until the last body chunk is sent, so
+    # streamed exports are timed completely
+
+    def __init__(self, app, debug_header: bool = False):
+        self.app = app
+        self.debug_header = debug_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_stats(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.debug_header:
+                    # statements of a streamed body run later and are not included
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Query-Count"] = str(stats.queries)
+                    headers["X-DB-Time-Ms"] = f"{stats.db_seconds * 1000:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_request.reset(token)
+            # the route template keeps the label set small, unmatched paths share one label
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_duration.observe((method, path, status), time.perf_counter() - started)
+            request_queries.observe((method, path), stats.queries)
+            request_db_seconds.inc((method, path), stats.db_seconds)
@@ -5,4 +5,6 @@ from .hero import Hero
 from .metric_value import MetricValue
 from .question import Question
 from .question_response import QuestionResponse
-from .text_feedback import TextFeedback
\ No newline at end of file
+from .text_feedback import TextFeedback, TextFeedbackCluster
+from .rollup import MetricValueRollup, QuestionResponseRollup
+from .summary import SessionSummary
\ No newline at end of file
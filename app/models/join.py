@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlmodel import SQLModel
+
+from app.models.metric import MetricPublic
+from app.models.question import QuestionPublic
+from app.models.slider import SliderPublic
+
+
+class JoinSessionInfo(SQLModel):
+    id: int
+    module_id: int
+    module_title: str
+    is_active: bool
+    start_time: datetime
+
+class JoinBootstrap(SQLModel):
+    # everything a student client needs after entering a join code
+    session: JoinSessionInfo
+    sliders: list[SliderPublic]
+    metrics: list[MetricPublic]
+    questions: list[QuestionPublic]
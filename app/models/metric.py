@@ -15,7 +15,7 @@ from pydantic import BaseModel
 
 class Metric(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    session_id: int = Field(foreign_key="session.id")
+    session_id: int = Field(foreign_key="session.id", index=True)
     title: str
 
 class MetricCreate(SQLModel):
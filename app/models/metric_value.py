@@ -12,17 +12,27 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
+from sqlalchemy import Index
 
 
 class MetricValue(SQLModel, table=True):
+    __table_args__ = (
+        # timeline queries: all values of a metric in a time range
+        Index("ix_metricvalue_metric_id_timestamp", "metric_id", "timestamp"),
+        # retried submissions (NULL nonces never conflict)
+        Index("ix_metricvalue_metric_id_client_nonce", "metric_id", "client_nonce", unique=True),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     metric_id: int = Field(foreign_key="metric.id")
     value: int = Field(ge=0, le=10)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    client_nonce: str | None = Field(default=None, max_length=64)
 
 class MetricValueCreate(SQLModel):
     metric_id: int
-    value: int
+    value: int = Field(ge=0, le=10)
+    client_nonce: str | None = Field(default=None, max_length=64) # same nonce = same submission
 
 class MetricValuePublic(SQLModel):
     value: int
@@ -31,6 +41,24 @@ class MetricValuePublic(SQLModel):
 class MetricResult(SQLModel):
     metric_id: int
     title: str
+    count: int = 0
     average: float | None
-    values: list[MetricValuePublic]
+    min: int | None = None
+    max: int | None = None
+    histogram: list[int] = [] # histogram[v] = number of submitted values v (0-10)
+    values: list[MetricValuePublic] = [] # only filled with include_values=true
+
+class MetricTimelineBucket(SQLModel):
+    start: datetime
+    count: int
+    average: float
+
+class MetricTimeline(SQLModel):
+    metric_id: int
+    title: str
+    buckets: list[MetricTimelineBucket]
 
+class MetricTimelineResult(SQLModel):
+    bucket_seconds: int
+    next_since: datetime | None # pass as since= to only fetch new (and the last, still open) buckets
+    metrics: list[MetricTimeline]
@@ -12,8 +12,16 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
+from sqlalchemy import Index
 
 class QuestionResponse(SQLModel, table=True):
+    __table_args__ = (
+        # retried submissions (NULL nonces never conflict)
+        Index("ix_questionresponse_question_id_client_nonce", "question_id", "client_nonce", unique=True),
+        # one answer per device (NULL: answers without device token are appended)
+        Index("ix_questionresponse_question_id_device_token", "question_id", "device_token", unique=True),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
 
     question_id: int = Field(foreign_key="question.id", index=True)
@@ -22,9 +30,16 @@ class QuestionResponse(SQLModel, table=True):
 
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+    client_nonce: str | None = Field(default=None, max_length=64)
+
+    device_token: str | None = Field(default=None, max_length=32) # device id from the X-Device-Token
+
+    answer_changes: int = Field(default=0, sa_column_kwargs={"server_default": "0"}) # how often the device changed its answer
+
 class QuestionResponseCreate(SQLModel):
     question_id: int
     answer: bool
+    client_nonce: str | None = Field(default=None, max_length=64) # same nonce = same submission
 
 class QuestionResult(SQLModel):
     question_id: int
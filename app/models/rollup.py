@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+
+# running aggregates, maintained in the same transaction as the raw rows
+# (see app/rollup.py) and rebuilt from them with `python -m app.rollup rebuild`
+
+class MetricValueRollup(SQLModel, table=True):
+    metric_id: int = Field(foreign_key="metric.id", primary_key=True)
+    value: int = Field(primary_key=True) # one row per submitted value 0-10
+    count: int = 0
+
+class QuestionResponseRollup(SQLModel, table=True):
+    question_id: int = Field(foreign_key="question.id", primary_key=True)
+    yes_count: int = 0
+    no_count: int = 0
@@ -15,10 +15,23 @@ from app.db import SessionDep
 from app.auth import CurrentActiveUserDI
 
 from sqlmodel import Field, SQLModel, select
+from sqlalchemy import Index, text
 from uuid import uuid4
 
 
 class Session(SQLModel, table=True):
+    __table_args__ = (
+        # start_session: is there an active session for this module?
+        Index("ix_session_module_id_is_active", "module_id", "is_active"),
+        # active sessions only, stays small however many sessions have ended
+        Index(
+            "ix_session_join_code_active",
+            "join_code",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active")
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     module_id: int = Field(foreign_key="module.id")
     start_time: datetime
@@ -12,6 +12,7 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
+from sqlalchemy import Index, SmallInteger
 
 class Slider(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -26,3 +27,40 @@ class SliderCreate(SQLModel):
 class SliderPublic(SQLModel):
     id: int
     text: str
+
+class SliderValue(SQLModel, table=True):
+    # one student answer to a module slider in one lecture session
+    __table_args__ = (
+        # per slider and session aggregation, answered from the index alone
+        Index("ix_slidervalue_slider_id_session_id_value", "slider_id", "session_id", "value"),
+        # retried submissions (NULL nonces never conflict)
+        Index("ix_slidervalue_slider_id_client_nonce", "slider_id", "client_nonce", unique=True),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    slider_id: int = Field(foreign_key="slider.id")
+    session_id: int = Field(foreign_key="session.id", index=True)
+    value: int = Field(ge=0, le=10, sa_type=SmallInteger)
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    client_nonce: str | None = Field(default=None, max_length=64)
+
+class SliderValueCreate(SQLModel):
+    slider_id: int
+    value: int = Field(ge=0, le=10)
+    client_nonce: str | None = Field(default=None, max_length=64) # same nonce = same submission
+
+class SliderSessionResult(SQLModel):
+    session_id: int
+    start_time: datetime
+    count: int = 0
+    average: float | None = None
+
+class SliderResult(SQLModel):
+    slider_id: int
+    text: str
+    count: int = 0
+    average: float | None = None
+    min: int | None = None
+    max: int | None = None
+    histogram: list[int] = [] # histogram[v] = number of submitted values v (0-10), all sessions
+    sessions: list[SliderSessionResult] = [] # per lecture session, oldest first
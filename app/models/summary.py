@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from sqlalchemy import JSON
+from sqlmodel import SQLModel, Field
+
+
+class MetricSummary(SQLModel):
+    metric_id: int
+    title: str
+    count: int
+    average: float | None
+
+class SliderSummary(SQLModel):
+    slider_id: int
+    text: str
+    count: int
+    average: float | None
+
+class QuestionSummary(SQLModel):
+    question_id: int
+    text: str
+    yes_count: int
+    no_count: int
+    yes_ratio: float | None
+
+class SessionSummary(SQLModel, table=True):
+    # snapshot of a session's results, written when the session ends (app/summary.py)
+    session_id: int = Field(foreign_key="session.id", primary_key=True)
+    computed_at: datetime
+    participants: int
+    text_feedback_count: int
+    metrics: list[dict] = Field(default_factory=list, sa_type=JSON) # MetricSummary
+    sliders: list[dict] = Field(default_factory=list, sa_type=JSON) # SliderSummary
+    questions: list[dict] = Field(default_factory=list, sa_type=JSON) # QuestionSummary
+
+class SessionAnalytics(SQLModel):
+    session_id: int
+    start_time: datetime
+    end_time: datetime | None
+    is_active: bool
+    final: bool # False: session running or just ended, numbers can still change
+    participants: int
+    text_feedback_count: int
+    metrics: list[MetricSummary]
+    sliders: list[SliderSummary]
+    questions: list[QuestionSummary]
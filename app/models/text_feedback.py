@@ -12,9 +12,35 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
+from sqlalchemy import Index, UniqueConstraint
 
 
+class TextFeedbackCluster(SQLModel, table=True):
+    # identical comments (after normalization, see app/clustering.py) of a session
+    __table_args__ = (
+        UniqueConstraint("session_id", "fingerprint"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+
+    session_id: int = Field(foreign_key="session.id")
+
+    fingerprint: str = Field(max_length=32)
+
+    content: str # first comment of the cluster
+
+    count: int = 0
+
+    first_seen: datetime
+
+    last_seen: datetime
+
 class TextFeedback(SQLModel, table=True):
+    __table_args__ = (
+        # keyset pagination of a session's feedback ordered by (timestamp, id)
+        Index("ix_textfeedback_session_id_timestamp_id", "session_id", "timestamp", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
 
     session_id: int = Field(foreign_key="session.id", index=True)
@@ -23,9 +49,27 @@ class TextFeedback(SQLModel, table=True):
 
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+    cluster_id: int | None = Field(default=None, foreign_key="textfeedbackcluster.id", index=True)
+
 class TextFeedbackCreate(SQLModel):
     content: str
 
 class TextFeedbackPublic(SQLModel):
     content: str
     timestamp: datetime
+    cluster_id: int | None = None
+
+class TextFeedbackClusterPublic(SQLModel):
+    id: int
+    content: str
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+
+class TextFeedbackSearchHit(SQLModel):
+    id: int
+    session_id: int
+    content: str
+    timestamp: datetime
+    rank: float
+    highlighted: str # HTML escaped content, matches wrapped in <mark></mark>
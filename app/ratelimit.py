@@ -0,0 +1,203 @@
+import hashlib
+import importlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+from app.db import AsyncSessionDep
+from app.device import decode_device_token
+from app.join_code import resolve_join_code_async
+
+# Token bucket limit for the anonymous POST /feedback/*/{join_code} endpoints.
+# Every client of a join code has its own bucket holding up to `burst` tokens
+# that refill at `rate` tokens per second; a submission takes one token, and
+# without one the request is answered 429 with Retry-After before it touches
+# the database. A client is identified by address + User-Agent, which a lecture
+# hall behind one NAT with the same browser everywhere shares, so the limit is
+# opt-in (RATE_LIMIT_ENABLED). A client sending a device token of the join code's
+# session (X-Device-Token, see app/device.py) gets a bucket per device instead;
+# its address + User-Agent then only has to stay within the much larger
+# RATE_LIMIT_ADDRESS_* bucket sized for a class, which also bounds what one
+# client can do with many device tokens.
+#
+# The buckets live in process memory by default. With several workers or hosts
+# each process limits on its own; RATE_LIMIT_BACKEND="package.module:factory"
+# plugs in a shared implementation of RateLimitBackend (e.g. on Redis).
+
+
+class RateLimitBackend(Protocol):
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        # take one token from the bucket of key, return 0 when it was available,
+        # otherwise the seconds until the next token
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+class MemoryRateLimitBackend:
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.evictions = 0
+        # key -> (tokens, last refill), least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                retry_after = 0.0
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # a forgotten bucket is a full one, so evicting idle clients is harmless
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return retry_after
+
+    def prune(self, rate: float, burst: int, limit: int) -> int:
+        # buckets that have refilled completely, oldest first; these mean the same as no bucket
+        full_after = burst / rate
+        now = time.monotonic()
+        pruned = 0
+        with self._lock:
+            while pruned < limit and self._buckets:
+                key, (_, updated) = next(iter(self._buckets.items()))
+                if now - updated < full_after:
+                    break
+                del self._buckets[key]
+                pruned += 1
+        return pruned
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._buckets)
+        return {"backend": "memory", "buckets": size, "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+class RateLimiter:
+
+    def __init__(self, backend: RateLimitBackend, rate: float, burst: int, enabled: bool = True):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.enabled = enabled
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, key: str) -> float:
+        if not self.enabled:
+            return 0.0
+        retry_after = self.backend.take(key, self.rate, self.burst)
+        if retry_after:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def prune(self, limit: int) -> int:
+        # only the memory backend needs this, a shared backend expires its own keys
+        prune = getattr(self.backend, "prune", None)
+        return prune(self.rate, self.burst, limit) if prune else 0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            **self.backend.stats(),
+        }
+
+
+def load_backend(path: str) -> RateLimitBackend:
+    if path == "memory":
+        return MemoryRateLimitBackend(maxsize=settings.rate_limit_maxsize)
+    module_name, _, factory = path.partition(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+def client_fingerprint(request: Request) -> str:
+    address = request.client.host if request.client else ""
+    if settings.rate_limit_trust_forwarded_for:
+        # behind a reverse proxy: the proxy appends the address it saw as the last
+        # entry, everything before it comes from the client and can be made up
+        address = request.headers.get("x-forwarded-for", address).split(",")[-1].strip()
+    user_agent = request.headers.get("user-agent", "")
+    return hashlib.blake2b(f"{address}|{user_agent}".encode(), digest_size=8).hexdigest()
+
+
+def device_fingerprint(request: Request, session_id: int) -> str | None:
+    # the device of a valid token for this session, a token of another session doesn't count
+    device_token = request.headers.get("x-device-token")
+    if not device_token:
+        return None
+    payload = decode_device_token(device_token)
+    if payload.get("session_id") != session_id:
+        return None
+    return payload["device"]
+
+
+feedback_rate_limiter = RateLimiter(
+    backend=load_backend(settings.rate_limit_backend),
+    rate=settings.rate_limit_per_second,
+    burst=settings.rate_limit_burst,
+    enabled=settings.rate_limit_enabled
+)
+
+# outer limit of an address + User-Agent whose submissions come with device tokens
+address_rate_limiter = RateLimiter(
+    backend=load_backend(settings.rate_limit_backend),
+    rate=settings.rate_limit_address_per_second,
+    burst=settings.rate_limit_address_burst,
+    enabled=settings.rate_limit_enabled
+)
+
+
+async def limit_feedback_rate(join_code: str, request: Request, session: AsyncSessionDep):
+    # dependency of the student submission endpoints
+    if not feedback_rate_limiter.enabled:
+        return
+    client = f"{join_code}:{client_fingerprint(request)}"
+    device = None
+    if "x-device-token" in request.headers:
+        # cached, the endpoint resolves the same join code right after
+        entry = await resolve_join_code_async(join_code, session)
+        device = device_fingerprint(request, entry.session_id) if entry else None
+    if device:
+        retry_after = address_rate_limiter.check(client) or feedback_rate_limiter.check(f"{join_code}:device-{device}")
+    else:
+        retry_after = feedback_rate_limiter.check(client)
+    if retry_after:
+        raise_too_many(retry_after)
+
+
+async def limit_device_registration(join_code: str, request: Request):
+    # dependency of POST /join/{code}/device: a class behind one NAT registers all
+    # its devices from one address, so it takes from the class sized bucket;
+    # what they submit is bounded by that bucket as well
+    retry_after = address_rate_limiter.check(f"{join_code}:{client_fingerprint(request)}")
+    if retry_after:
+        raise_too_many(retry_after)
+
+
+def raise_too_many(retry_after: float):
+    raise HTTPException(
+        status_code=429,
+        detail="Too many submissions, slow down",
+        headers={"Retry-After": str(math.ceil(retry_after))}
+    )
@@ -0,0 +1,99 @@
+import argparse
+from collections import Counter
+
+from sqlalchemy import delete, insert, text
+from sqlmodel import Session as DBSession, func, select
+
+from app.db import SessionDep, dialect_insert, engine
+from app.models import Metric, MetricValue, MetricValueRollup, Question, QuestionResponse, QuestionResponseRollup
+
+# Keeps MetricValueRollup / QuestionResponseRollup in step with the raw rows.
+# apply_* is called by app.ingest.write_rows inside the transaction that inserts
+# the raw rows, so both commit or roll back together.
+
+def apply_metric_values(session: SessionDep, rows: list[dict]):
+    counts = Counter((row["metric_id"], row["value"]) for row in rows)
+    if not counts:
+        return
+    statement = dialect_insert(session, MetricValueRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=["metric_id", "value"],
+        set_={"count": MetricValueRollup.__table__.c.count + statement.excluded["count"]}
+    )
+    # sorted so concurrent transactions lock rollup rows in the same order
+    session.execute(statement, [
+        {"metric_id": metric_id, "value": value, "count": count}
+        for (metric_id, value), count in sorted(counts.items())
+    ])
+
+def apply_question_responses(session: SessionDep, rows: list[dict]):
+    apply_question_counts(session, Counter(
+        (row["question_id"], row["answer"]) for row in rows
+    ))
+
+def apply_question_counts(session: SessionDep, counts: Counter):
+    # counts: (question_id, answer) -> change of the yes/no tally (may be negative)
+    deltas: dict[int, dict] = {}
+    for (question_id, answer), count in counts.items():
+        delta = deltas.setdefault(question_id, {"question_id": question_id, "yes_count": 0, "no_count": 0})
+        delta["yes_count" if answer else "no_count"] += count
+    if not deltas:
+        return
+    statement = dialect_insert(session, QuestionResponseRollup)
+    table = QuestionResponseRollup.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=["question_id"],
+        set_={
+            "yes_count": table.c.yes_count + statement.excluded.yes_count,
+            "no_count": table.c.no_count + statement.excluded.no_count,
+        }
+    )
+    session.execute(statement, [deltas[question_id] for question_id in sorted(deltas)])
+
+def rebuild_rollups(session: SessionDep, session_id: int | None = None):
+    # recompute the rollups from the raw rows, for all sessions or a single one
+    if session.get_bind().dialect.name == "postgresql":
+        # writers upsert the rollups after inserting their raw row; holding this lock
+        # makes them wait until the rebuild commits, so no submission is lost or counted twice
+        session.execute(text("LOCK TABLE metricvaluerollup, questionresponserollup IN SHARE ROW EXCLUSIVE MODE"))
+
+    metric_ids = select(Metric.id)
+    question_ids = select(Question.id)
+    if session_id is not None:
+        metric_ids = metric_ids.where(Metric.session_id == session_id)
+        question_ids = question_ids.where(Question.session_id == session_id)
+
+    session.execute(delete(MetricValueRollup).where(MetricValueRollup.metric_id.in_(metric_ids)))
+    session.execute(delete(QuestionResponseRollup).where(QuestionResponseRollup.question_id.in_(question_ids)))
+
+    session.execute(insert(MetricValueRollup).from_select(
+        ["metric_id", "value", "count"],
+        select(MetricValue.metric_id, MetricValue.value, func.count())
+        .where(MetricValue.metric_id.in_(metric_ids))
+        .group_by(MetricValue.metric_id, MetricValue.value)
+    ))
+    session.execute(insert(QuestionResponseRollup).from_select(
+        ["question_id", "yes_count", "no_count"],
+        select(
+            QuestionResponse.question_id,
+            func.count().filter(QuestionResponse.answer == True),
+            func.count().filter(QuestionResponse.answer == False)
+        )
+        .where(QuestionResponse.question_id.in_(question_ids))
+        .group_by(QuestionResponse.question_id)
+    ))
+
+def delete_metric_rollups(session: SessionDep, metric_ids):
+    session.execute(delete(MetricValueRollup).where(MetricValueRollup.metric_id.in_(metric_ids)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the feedback rollup tables")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--session-id", type=int, default=None, help="only rebuild this lecture session")
+    args = parser.parse_args()
+
+    with DBSession(engine) as session:
+        rebuild_rollups(session, args.session_id)
+        session.commit()
+    print("rollups rebuilt" + (f" for session {args.session_id}" if args.session_id else ""))
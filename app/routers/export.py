@@ -0,0 +1,188 @@
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
+from fastapi.responses import StreamingResponse
+from sqlmodel import SQLModel, Field, Session as DBSession, select
+
+from app.db import SessionDep, engine
+from app.auth import CurrentActiveUserDI
+from typing import Union, Annotated, Literal
+
+from datetime import datetime
+
+import csv
+import io
+import json
+
+from app.models import Session, Metric, MetricValue, Module, Question, QuestionResponse, TextFeedback
+from app.models.slider import Slider, SliderValue
+
+router = APIRouter(tags=["Export"])
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Exports stream rows from a server side cursor (yield_per) in chunks of
+# EXPORT_CHUNK_SIZE, so memory stays flat however many rows a session has.
+#
+# csv: one table for all feedback
+#     kind,session_id,item_id,item_text,value,timestamp
+#     kind is metric / slider / question / text; value is the 0-10 value, true/false or the comment
+# columnar: newline delimited JSON, one line per table chunk with one array per column
+#     {"table": "metric_value", "columns": {"session_id": [...], "metric_id": [...], ...}}
+
+CSV_HEADER = ["kind", "session_id", "item_id", "item_text", "value", "timestamp"]
+
+def metric_value_statement(session_ids):
+    return (
+        select(Metric.session_id, Metric.id, Metric.title, MetricValue.value, MetricValue.timestamp)
+        .join(MetricValue, MetricValue.metric_id == Metric.id)
+        .where(Metric.session_id.in_(session_ids))
+        .order_by(MetricValue.id)
+    )
+
+def slider_value_statement(session_ids):
+    return (
+        select(SliderValue.session_id, Slider.id, Slider.text, SliderValue.value, SliderValue.timestamp)
+        .join(Slider, Slider.id == SliderValue.slider_id)
+        .where(SliderValue.session_id.in_(session_ids))
+        .order_by(SliderValue.id)
+    )
+
+def question_response_statement(session_ids):
+    return (
+        select(Question.session_id, Question.id, Question.text, QuestionResponse.answer, QuestionResponse.timestamp)
+        .join(QuestionResponse, QuestionResponse.question_id == Question.id)
+        .where(Question.session_id.in_(session_ids))
+        .order_by(QuestionResponse.id)
+    )
+
+def text_feedback_statement(session_ids):
+    return (
+        select(TextFeedback.session_id, TextFeedback.content, TextFeedback.timestamp)
+        .where(TextFeedback.session_id.in_(session_ids))
+        .order_by(TextFeedback.id)
+    )
+
+def stream_chunks(session: DBSession, statement):
+    result = session.exec(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    yield from result.partitions()
+
+def export_csv(session_ids: list[int]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(CSV_HEADER)
+    yield take()
+    with DBSession(engine) as session:
+        for rows in stream_chunks(session, metric_value_statement(session_ids)):
+            for session_id, metric_id, title, value, timestamp in rows:
+                writer.writerow(["metric", session_id, metric_id, title, value, timestamp.isoformat()])
+            yield take()
+        for rows in stream_chunks(session, slider_value_statement(session_ids)):
+            for session_id, slider_id, text, value, timestamp in rows:
+                writer.writerow(["slider", session_id, slider_id, text, value, timestamp.isoformat()])
+            yield take()
+        for rows in stream_chunks(session, question_response_statement(session_ids)):
+            for session_id, question_id, text, answer, timestamp in rows:
+                writer.writerow(["question", session_id, question_id, text, "true" if answer else "false", timestamp.isoformat()])
+            yield take()
+        for rows in stream_chunks(session, text_feedback_statement(session_ids)):
+            for session_id, content, timestamp in rows:
+                writer.writerow(["text", session_id, "", "", content, timestamp.isoformat()])
+            yield take()
+
+def columnar_chunk(table: str, names: list[str], rows) -> str:
+    columns = {name: [] for name in names}
+    for row in rows:
+        for name, value in zip(names, row):
+            columns[name].append(value)
+    return json.dumps({"table": table, "columns": columns}, default=datetime.isoformat) + "\n"
+
+def export_columnar(session_ids: list[int]):
+    yield json.dumps({"format": "swipeback-columnar", "version": 1, "session_ids": session_ids}) + "\n"
+    with DBSession(engine) as session:
+        metrics = session.exec(
+            select(Metric.id, Metric.session_id, Metric.title).where(Metric.session_id.in_(session_ids))
+        ).all()
+        yield columnar_chunk("metric", ["id", "session_id", "title"], metrics)
+        questions = session.exec(
+            select(Question.id, Question.session_id, Question.text).where(Question.session_id.in_(session_ids))
+        ).all()
+        yield columnar_chunk("question", ["id", "session_id", "text"], questions)
+        sliders = session.exec(
+            select(Slider.id, Slider.module_id, Slider.text)
+            .where(Slider.module_id.in_(select(Session.module_id).where(Session.id.in_(session_ids))))
+        ).all()
+        yield columnar_chunk("slider", ["id", "module_id", "text"], sliders)
+
+        for rows in stream_chunks(session, metric_value_statement(session_ids)):
+            yield columnar_chunk(
+                "metric_value",
+                ["session_id", "metric_id", "value", "timestamp"],
+                [(session_id, metric_id, value, timestamp) for session_id, metric_id, _, value, timestamp in rows]
+            )
+        for rows in stream_chunks(session, slider_value_statement(session_ids)):
+            yield columnar_chunk(
+                "slider_value",
+                ["session_id", "slider_id", "value", "timestamp"],
+                [(session_id, slider_id, value, timestamp) for session_id, slider_id, _, value, timestamp in rows]
+            )
+        for rows in stream_chunks(session, question_response_statement(session_ids)):
+            yield columnar_chunk(
+                "question_response",
+                ["session_id", "question_id", "answer", "timestamp"],
+                [(session_id, question_id, answer, timestamp) for session_id, question_id, _, answer, timestamp in rows]
+            )
+        for rows in stream_chunks(session, text_feedback_statement(session_ids)):
+            yield columnar_chunk("text_feedback", ["session_id", "content", "timestamp"], rows)
+
+def export_response(session_ids: list[int], format: str, name: str) -> StreamingResponse:
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(session_ids),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{name}.csv"'}
+        )
+    return StreamingResponse(
+        export_columnar(session_ids),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}.columnar.ndjson"'}
+    )
+
+def get_own_module(module_id: int, session: SessionDep, user: CurrentActiveUserDI) -> Module:
+    module = session.get(Module, module_id)
+    if not module:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if module.user_id != user.username:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    return module
+
+@router.get("/feedback/sessions/{session_id}/export")
+def export_session(
+    session_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI,
+    format: Literal["csv", "columnar"] = "csv"
+):
+    db_session = session.get(Session, session_id)
+    if not db_session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    get_own_module(db_session.module_id, session, user)
+    return export_response([session_id], format, f"session-{session_id}")
+
+@router.get("/modules/{module_id}/export")
+def export_module(
+    module_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI,
+    format: Literal["csv", "columnar"] = "csv"
+):
+    get_own_module(module_id, session, user)
+    session_ids = session.exec(
+        select(Session.id).where(Session.module_id == module_id).order_by(Session.id)
+    ).all()
+    return export_response(list(session_ids), format, f"module-{module_id}")
@@ -0,0 +1,41 @@
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter, Header, Response
+
+from typing import Annotated
+
+from app.db import AsyncSessionDep
+from app.device import DeviceToken, create_device_token
+from app.join_code import resolve_bootstrap_async, resolve_join_code_async
+from app.models.join import JoinBootstrap
+from app.ratelimit import limit_device_registration
+
+router = APIRouter(prefix="/join", tags=["Join"])
+
+@router.get("/{join_code}", response_model=JoinBootstrap)
+async def get_join_bootstrap(
+    join_code: str,
+    session: AsyncSessionDep,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    # session, sliders, metrics and questions in one response, served from memory;
+    # clients revalidate with If-None-Match and get a 304 while nothing changed
+    entry = await resolve_bootstrap_async(join_code, session)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@router.post(
+    "/{join_code}/device",
+    response_model=DeviceToken,
+    dependencies=[Depends(limit_device_registration)]
+)
+async def register_device(join_code: str, session: AsyncSessionDep):
+    # anonymous token for one student device, see app/device.py
+    entry = await resolve_join_code_async(join_code, session)
+    if not entry or not entry.is_active:
+        raise HTTPException(status_code=404, detail="Session not found or inactive")
+
+    return create_device_token(entry.session_id)
@@ -0,0 +1,86 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session as DBSession, func, select
+
+from app.auth import get_current_active_user, get_current_user
+from app.db import engine
+from app.live import RESYNC, LiveSubscriber, live_results
+from app.models import Session, TextFeedback
+from app.routers.metric_value import aggregate_metric_results
+from app.routers.question_response import aggregate_question_results
+
+router = APIRouter(prefix="/feedback", tags=["Live Results"])
+
+def load_snapshot(session_id: int) -> dict:
+    with DBSession(engine) as session:
+        metrics = aggregate_metric_results(session, session_id)
+        questions = aggregate_question_results(session, session_id)
+        text_feedback = session.exec(
+            select(func.count(TextFeedback.id)).where(TextFeedback.session_id == session_id)
+        ).one()
+    return {
+        "type": "snapshot",
+        "metrics": [metric.model_dump(mode="json") for metric in metrics],
+        "questions": [question.model_dump(mode="json") for question in questions],
+        "text_feedback": text_feedback,
+    }
+
+SNAPSHOT_ATTEMPTS = 3
+
+async def load_exact_snapshot(subscriber: LiveSubscriber, session_id: int) -> dict:
+    # A submission is published after its commit, so one that is written while
+    # the snapshot loads may or may not be in it. Load again until nothing was
+    # written meanwhile; if the session is too busy for that, send the last
+    # snapshot and replace it with a new one shortly.
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        marker = live_results.snapshot_marker(session_id)
+        snapshot = await run_in_threadpool(load_snapshot, session_id)
+        exact = live_results.snapshot_is_exact(session_id, marker)
+        if exact:
+            break
+    snapshot["seq"] = live_results.seq(session_id)
+    live_results.mark_ready(session_id, subscriber)
+    if not exact:
+        live_results.schedule_resync(session_id, subscriber)
+    return snapshot
+
+async def forward_updates(websocket: WebSocket, subscriber: LiveSubscriber, session_id: int):
+    while True:
+        message = await subscriber.queue.get()
+        if message is RESYNC:
+            message = await load_exact_snapshot(subscriber, session_id)
+        await websocket.send_json(message)
+
+# the dashboard first gets a snapshot (same numbers as the results endpoints),
+# afterwards only deltas: {"type": "delta", "metrics": {id: {count, sum, histogram}},
+# "questions": {id: {yes_count, no_count}}, "text_feedback": n, "seq": n}. Both carry
+# "seq"; a delta continues the last snapshot, a new snapshot replaces everything
+@router.websocket("/sessions/{session_id}/live")
+async def live_results_socket(websocket: WebSocket, session_id: int, token: str):
+    # browsers can't send an Authorization header on websockets, so the JWT comes as ?token=
+    with DBSession(engine) as session:
+        try:
+            user = await get_current_active_user(await get_current_user(token, session))
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        if not session.get(Session, session_id):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Session not found")
+            return
+
+    await websocket.accept()
+    subscriber = live_results.subscribe(session_id)
+    sender = None
+    try:
+        await websocket.send_json(await load_exact_snapshot(subscriber, session_id))
+        sender = asyncio.create_task(forward_updates(websocket, subscriber, session_id))
+        while True:
+            await websocket.receive_text() # only used to notice the disconnect
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if sender:
+            sender.cancel()
+        live_results.unsubscribe(session_id, subscriber)
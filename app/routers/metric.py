@@ -14,9 +14,10 @@ from jwt.exceptions import InvalidTokenError
 from sqlalchemy import delete
 
 from pydantic import BaseModel
-from app.models import Session, Module, Hero
+from app.models import Session, Module, Hero, MetricValue
 
-from app.routers.metric_value import delete_metric_values
+from app.join_code import invalidate_join_code, invalidate_session
+from app.rollup import delete_metric_rollups
 
 router = APIRouter(tags=["metrics"])
 
@@ -43,6 +44,7 @@ def create_metric(
     session.add(db_metric)
     session.commit()
     session.refresh(db_metric)
+    invalidate_join_code(db_session.join_code)
     return db_metric
 
 
@@ -73,6 +75,7 @@ def update_metric(
     session.add(metric)
     session.commit()
     session.refresh(metric)
+    invalidate_session(metric.session_id)
     return metric
 
 
@@ -86,8 +89,12 @@ def delete_metric(
     if not metric:
         raise HTTPException(status_code=404, detail="Metric not found")
 
+    metric_session_id = metric.session_id
+    session.exec(delete(MetricValue).where(MetricValue.metric_id == metric_id))
+    delete_metric_rollups(session, [metric_id])
     session.delete(metric)
     session.commit()
+    invalidate_session(metric_session_id)
 
 @router.delete("/metrics/all/{session_id}", status_code=204)
 def delete_metric(
@@ -95,8 +102,11 @@ def delete_metric(
     session: SessionDep,
     user: CurrentActiveUserDI
 ):
-    delete_metric_values()
+    metric_ids = select(Metric.id).where(Metric.session_id == session_id)
+    session.exec(delete(MetricValue).where(MetricValue.metric_id.in_(metric_ids)))
+    delete_metric_rollups(session, metric_ids)
     session.exec(
         delete(Metric).where(Metric.session_id == session_id)
     )
     session.commit()
+    invalidate_session(session_id)
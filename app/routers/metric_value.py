@@ -1,52 +1,70 @@
 from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
 from sqlmodel import SQLModel, Field, select
 
-from app.db import SessionDep
+from app.db import SessionDep, AsyncSessionDep
 from app.auth import CurrentActiveUserDI
-from app.models.metric_value import MetricValue, MetricValueCreate, MetricValuePublic, MetricResult
+from app.models.metric_value import MetricValue, MetricValueCreate, MetricValuePublic, MetricResult, MetricTimeline, MetricTimelineBucket, MetricTimelineResult
 from datetime import datetime, timedelta, timezone
-from typing import Union, Annotated
+from typing import Union, Annotated, Literal
 
 from contextlib import asynccontextmanager
 
 import jwt
 from jwt.exceptions import InvalidTokenError
-from sqlalchemy import delete
+from sqlalchemy import BigInteger, delete, cast, func
 from pydantic import BaseModel
-from app.models import Session, Metric, Module, Hero
+from app.models import Session, Metric, Module, Hero, MetricValueRollup
+from app.join_code import resolve_join_code_async
+from app.ingest import store_feedback_async
+from app.ratelimit import limit_feedback_rate
+from app.idempotency import claim_submission, idempotency_key, release_submission
+from app.live import live_results
+from app.rollup import delete_metric_rollups
 
 
 router = APIRouter(prefix="/feedback", tags=["Metric Values"])
 
-@router.post("/metric/{join_code}")
-def submit_metric_value(join_code: str, data: MetricValueCreate, session: SessionDep):
+@router.post("/metric/{join_code}", dependencies=[Depends(limit_feedback_rate)])
+async def submit_metric_value(
+    join_code: str,
+    data: MetricValueCreate,
+    session: AsyncSessionDep,
+    key: Annotated[str | None, Depends(idempotency_key)]
+):
     # aktive Session über Join-Code finden
-    db_session = session.exec(
-        select(Session).where(
-            Session.join_code == join_code,
-            Session.is_active == True
-        )
-    ).first()
-
-    if not db_session:
+    entry = await resolve_join_code_async(join_code, session)
+    if not entry or not entry.is_active:
         raise HTTPException(status_code=404, detail="Session not found or inactive")
 
     # Metric prüfen
-    metric = session.get(Metric, data.metric_id)
-    if not metric or metric.session_id != db_session.id:
+    if data.metric_id not in entry.metric_ids:
         raise HTTPException(status_code=404, detail="Metric not found")
 
-    # MetricValue speichern
-    metric_value = MetricValue(
-        metric_id=data.metric_id,
-        value=data.value
-    )
-
-    session.add(metric_value)
-    session.commit()
+    # retry of a submission that was already accepted: nothing to do
+    nonce = data.client_nonce or key
+    if not claim_submission("metric", data.metric_id, nonce):
+        return {"status": "ok"}
+
+    # store the MetricValue (directly or through the ingest buffer)
+    # a live snapshot loading meanwhile can't tell whether it has this submission (app/routers/live.py)
+    with live_results.writing(entry.session_id):
+        try:
+            stored = await store_feedback_async(session, MetricValue, {
+                "metric_id": data.metric_id,
+                "value": data.value,
+                "timestamp": datetime.utcnow(),
+                "client_nonce": nonce
+            })
+        except BaseException:
+            release_submission("metric", data.metric_id, nonce)
+            raise
+        if stored:
+            live_results.publish_metric_value(entry.session_id, data.metric_id, data.value)
 
     return {"status": "ok"}
 
+HISTOGRAM_BUCKETS = range(0, 11) # MetricValue.value is 0-10
+
 @router.get(
     "/sessions/{session_id}/metrics/results",
     response_model=list[MetricResult]
@@ -54,47 +72,162 @@ def submit_metric_value(join_code: str, data: MetricValueCreate, session: Sessio
 def get_metric_results(
     session_id: int,
     session: SessionDep,
-    user: CurrentActiveUserDI
+    user: CurrentActiveUserDI,
+    include_values: bool = False,
+    values_offset: Annotated[int, Query(ge=0)] = 0,
+    values_limit: Annotated[int, Query(ge=1, le=1000)] = 100
 ):
     # Session prüfen
     db_session = session.get(Session, session_id)
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Alle Metrics der Session
-    metrics = session.exec(
-        select(Metric).where(Metric.session_id == session_id)
-    ).all()
+    results = aggregate_metric_results(session, session_id)
 
-    results: list[MetricResult] = []
+    if include_values:
+        values_by_metric = get_metric_values_page(session, session_id, values_offset, values_limit)
+        for result in results:
+            result.values = values_by_metric.get(result.metric_id, [])
 
-    for metric in metrics:
-        values = session.exec(
-            select(MetricValue).where(MetricValue.metric_id == metric.id)
-        ).all()
+    return results
+
+def aggregate_metric_results(session: SessionDep, session_id: int) -> list[MetricResult]:
+    # read from the rollup: at most one row per (metric, value 0-10)
+    statement = (
+        select(Metric.id, Metric.title, MetricValueRollup.value, MetricValueRollup.count)
+        .outerjoin(MetricValueRollup, MetricValueRollup.metric_id == Metric.id)
+        .where(Metric.session_id == session_id)
+        .order_by(Metric.id, MetricValueRollup.value)
+    )
 
-        public_values = [
-            MetricValuePublic(
-                value=v.value,
-                timestamp=v.timestamp
+    results: dict[int, MetricResult] = {}
+    for metric_id, title, value, count in session.exec(statement):
+        result = results.get(metric_id)
+        if result is None:
+            result = MetricResult(
+                metric_id=metric_id,
+                title=title,
+                average=None,
+                histogram=[0 for _ in HISTOGRAM_BUCKETS]
             )
-            for v in values
-        ]
+            results[metric_id] = result
+        if value is None or not count:
+            continue
+        if value not in HISTOGRAM_BUCKETS:
+            # rows stored before the 0-10 validation, leave them out of the results
+            continue
+        result.histogram[value] += count
+        result.count += count
+        result.min = value if result.min is None else min(result.min, value)
+        result.max = value if result.max is None else max(result.max, value)
+
+    for result in results.values():
+        if result.count:
+            result.average = sum(value * count for value, count in enumerate(result.histogram)) / result.count
+    return list(results.values())
+
+def get_metric_values_page(
+    session: SessionDep,
+    session_id: int,
+    offset: int,
+    limit: int
+) -> dict[int, list[MetricValuePublic]]:
+    # one page of raw values per metric, numbered per metric with a window function
+    row_number = func.row_number().over(
+        partition_by=MetricValue.metric_id,
+        order_by=(MetricValue.timestamp, MetricValue.id)
+    ).label("row_number")
+    ranked = (
+        select(MetricValue.metric_id, MetricValue.value, MetricValue.timestamp, row_number)
+        .join(Metric, Metric.id == MetricValue.metric_id)
+        .where(Metric.session_id == session_id)
+        .subquery()
+    )
+    statement = (
+        select(ranked.c.metric_id, ranked.c.value, ranked.c.timestamp)
+        .where(ranked.c.row_number > offset, ranked.c.row_number <= offset + limit)
+        .order_by(ranked.c.metric_id, ranked.c.row_number)
+    )
 
-        average = (
-            sum(v.value for v in values) / len(values)
-            if values else None
+    values_by_metric: dict[int, list[MetricValuePublic]] = {}
+    for metric_id, value, timestamp in session.exec(statement):
+        values_by_metric.setdefault(metric_id, []).append(
+            MetricValuePublic(value=value, timestamp=timestamp)
         )
+    return values_by_metric
 
-        results.append(
-            MetricResult(
-                metric_id=metric.id,
-                title=metric.title,
-                average=average,
-                values=public_values
-            )
+TIMELINE_BUCKETS = {"10s": 10, "1m": 60, "5m": 300}
+
+def epoch_bucket(session: SessionDep, column, seconds: int):
+    # unix time of the start of the bucket the timestamp falls into
+    if session.get_bind().dialect.name == "sqlite":
+        epoch = cast(func.strftime("%s", column), BigInteger)
+    else:
+        epoch = cast(func.floor(func.extract("epoch", column)), BigInteger)
+    return epoch // seconds * seconds
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_utc_naive(moment: datetime) -> datetime:
+    # timestamps are stored as naive UTC (datetime.utcnow)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def floor_to_bucket(moment: datetime, seconds: int) -> datetime:
+    elapsed = int((moment - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+@router.get(
+    "/sessions/{session_id}/metrics/timeline",
+    response_model=MetricTimelineResult
+)
+def get_metric_timeline(
+    session_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI,
+    bucket: Literal["10s", "1m", "5m"] = "1m",
+    since: datetime | None = None
+):
+    db_session = session.get(Session, session_id)
+    if not db_session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    seconds = TIMELINE_BUCKETS[bucket]
+    metrics = session.exec(
+        select(Metric.id, Metric.title).where(Metric.session_id == session_id).order_by(Metric.id)
+    ).all()
+    timelines = {
+        metric_id: MetricTimeline(metric_id=metric_id, title=title, buckets=[])
+        for metric_id, title in metrics
+    }
+
+    # per metric and bucket: count and average, backed by (metric_id, timestamp)
+    bucket_start = epoch_bucket(session, MetricValue.timestamp, seconds).label("bucket_start")
+    statement = (
+        select(MetricValue.metric_id, bucket_start, func.count(MetricValue.id), func.avg(MetricValue.value))
+        .where(MetricValue.metric_id.in_(list(timelines)))
+        .group_by(MetricValue.metric_id, bucket_start)
+        .order_by(MetricValue.metric_id, bucket_start)
+    )
+    if since is not None:
+        since = floor_to_bucket(to_utc_naive(since), seconds)
+        statement = statement.where(MetricValue.timestamp >= since)
+
+    next_since = since
+    for metric_id, start, count, average in session.exec(statement):
+        start = EPOCH + timedelta(seconds=int(start))
+        timelines[metric_id].buckets.append(
+            MetricTimelineBucket(start=start, count=count, average=float(average))
         )
-    return results
+        if next_since is None or start > next_since:
+            next_since = start
+
+    return MetricTimelineResult(
+        bucket_seconds=seconds,
+        next_since=next_since,
+        metrics=list(timelines.values())
+    )
 
 @router.delete("/all/{metric_id}", status_code=204)
 def delete_metric_values(
@@ -105,4 +238,5 @@ def delete_metric_values(
     session.exec(
         delete(MetricValue).where(MetricValue.metric_id == metric_id)
     )
+    delete_metric_rollups(session, [metric_id])
     session.commit()
\ No newline at end of file
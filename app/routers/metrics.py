@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import render_metrics
+
+router = APIRouter(tags=["stats"])
+
+# scraped by Prometheus, not meant to be public: restrict /metrics at the proxy
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
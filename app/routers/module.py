@@ -14,6 +14,9 @@ from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
 from app.models import Metric, Hero
+from app.join_code import invalidate_module
+from app.models.summary import SessionAnalytics
+from app.summary import get_module_analytics
 
 router = APIRouter(prefix="/modules", tags=["modules"])
 
@@ -54,6 +57,20 @@ def read_module( # to show the exact module
         raise HTTPException(status_code=403, detail="Not allowed")
     return module
 
+@router.get("/{module_id}/analytics", response_model=list[SessionAnalytics])
+def read_module_analytics( # one summary row per session, oldest first
+    module_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI
+):
+    module = session.get(Module, module_id)
+    if not module:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if module.user_id != user.username:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    return get_module_analytics(session, module_id)
+
 @router.patch("/{module_id}", response_model=ModulePublic)
 def update_module(
     module_id: int,
@@ -73,6 +90,7 @@ def update_module(
     session.add(module)
     session.commit()
     session.refresh(module)
+    invalidate_module(module_id)
     return module
 
 
@@ -91,3 +109,4 @@ def delete_module(
     
     session.delete(module)
     session.commit()
+    invalidate_module(module_id)
@@ -14,6 +14,7 @@ from jwt.exceptions import InvalidTokenError
 from pydantic import BaseModel
 from app.models import Session, Metric, Module, Hero
 from app.models.question import Question, QuestionCreate, QuestionPublic
+from app.join_code import resolve_join_code, invalidate_join_code
 
 router = APIRouter(prefix="/sessions", tags=["Questions"])
 
@@ -36,6 +37,7 @@ def create_question(
     session.add(question)
     session.commit()
     session.refresh(question)
+    invalidate_join_code(db_session.join_code)
 
     return question
 
@@ -55,10 +57,10 @@ def get_questions(
     join_code: str,
     session: SessionDep
 ):
-    db_session = session.exec(select(Session).where(Session.join_code == join_code)).first()
-    if not db_session:
+    entry = resolve_join_code(join_code, session)
+    if not entry:
         raise HTTPException(status_code=404, detail="Session not found")
-    session_id = db_session.id
+    session_id = entry.session_id
     questions = session.exec(
         select(Question).where(Question.session_id == session_id)
     ).all()
@@ -1,7 +1,7 @@
-from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter, Header
 from sqlmodel import SQLModel, Field, select
 
-from app.db import SessionDep
+from app.db import SessionDep, AsyncSessionDep
 from app.auth import CurrentActiveUserDI
 from datetime import datetime, timedelta, timezone
 from typing import Union, Annotated
@@ -12,39 +12,58 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
-from app.models import Session, Metric, Module, Hero, Question
+from sqlalchemy import delete, func
+from app.models import Session, Metric, Module, Hero, Question, QuestionResponseRollup
 from app.models.question_response import QuestionResponse, QuestionResponseCreate, QuestionResult
+from app.join_code import resolve_join_code_async
+from app.ingest import store_feedback_async
+from app.ratelimit import limit_feedback_rate
+from app.idempotency import claim_submission, idempotency_key, release_submission
+from app.live import live_results
+from app.device import get_device_id
 
 router = APIRouter(prefix="/feedback", tags=["Question Responses"])
 
 
-@router.post("/question/{join_code}")
-def submit_question_response(
+@router.post("/question/{join_code}", dependencies=[Depends(limit_feedback_rate)])
+async def submit_question_response(
     join_code: str,
     data: QuestionResponseCreate,
-    session: SessionDep
+    session: AsyncSessionDep,
+    key: Annotated[str | None, Depends(idempotency_key)],
+    x_device_token: Annotated[str | None, Header()] = None
 ):
-    db_session = session.exec(
-        select(Session).where(
-            Session.join_code == join_code,
-            Session.is_active == True
-        )
-    ).first()
-
-    if not db_session:
+    entry = await resolve_join_code_async(join_code, session)
+    if not entry or not entry.is_active:
         raise HTTPException(status_code=404, detail="Session not found or inactive")
 
-    question = session.get(Question, data.question_id)
-    if not question or question.session_id != db_session.id:
+    if data.question_id not in entry.question_ids:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    response = QuestionResponse(
-        question_id=data.question_id,
-        answer=data.answer
-    )
-
-    session.add(response)
-    session.commit()
+    # with a device token the answer replaces the device's previous one
+    device_id = get_device_id(x_device_token, entry.session_id) if x_device_token else None
+
+    nonce = data.client_nonce or key
+    if not claim_submission("question", data.question_id, nonce):
+        return {"status": "ok"}
+
+    # a live snapshot loading meanwhile can't tell whether it has this submission (app/routers/live.py)
+    with live_results.writing(entry.session_id):
+        try:
+            stored = await store_feedback_async(session, QuestionResponse, {
+                "question_id": data.question_id,
+                "answer": data.answer,
+                "timestamp": datetime.utcnow(),
+                "client_nonce": nonce,
+                "device_token": device_id
+            }, session_id=entry.session_id)
+        except BaseException:
+            release_submission("question", data.question_id, nonce)
+            raise
+        for row in stored:
+            live_results.publish_question_response(
+                entry.session_id, data.question_id, data.answer, changed=bool(row.get("answer_changes"))
+            )
 
     return {"status": "ok"}
 
@@ -58,32 +77,31 @@ def get_question_results(
     session: SessionDep,
     user: CurrentActiveUserDI
 ):
-    questions = session.exec(
-        select(Question).where(Question.session_id == session_id)
-    ).all()
-
-    results: list[QuestionResult] = []
-
-    for question in questions:
-        responses = session.exec(
-            select(QuestionResponse).where(
-                QuestionResponse.question_id == question.id
-            )
-        ).all()
-
-        yes_count = sum(1 for r in responses if r.answer)
-        no_count = sum(1 for r in responses if not r.answer)
-
-        results.append(
-            QuestionResult(
-                question_id=question.id,
-                text=question.text,
-                yes_count=yes_count,
-                no_count=no_count
-            )
+    return aggregate_question_results(session, session_id)
+
+def aggregate_question_results(session: SessionDep, session_id: int) -> list[QuestionResult]:
+    # yes/no tallies come from the rollup, one row per question
+    statement = (
+        select(
+            Question.id,
+            Question.text,
+            QuestionResponseRollup.yes_count,
+            QuestionResponseRollup.no_count
         )
+        .outerjoin(QuestionResponseRollup, QuestionResponseRollup.question_id == Question.id)
+        .where(Question.session_id == session_id)
+        .order_by(Question.id)
+    )
 
-    return results
+    return [
+        QuestionResult(
+            question_id=question_id,
+            text=text,
+            yes_count=yes_count or 0,
+            no_count=no_count or 0
+        )
+        for question_id, text, yes_count, no_count in session.exec(statement)
+    ]
 
 @router.delete("/sessions/{session_id}/questions/results}", status_code=204)
 def delete_metric(
@@ -16,6 +16,8 @@ from app.auth import CurrentActiveUserDI
 
 from sqlmodel import Field, SQLModel, select
 from app.models import Module, Hero, Session
+from app.join_code import invalidate_join_code
+from app.summary import close_session
 from uuid import uuid4
 
 
@@ -49,6 +51,7 @@ def start_session(
     session.add(db_session)
     session.commit()
     session.refresh(db_session)
+    invalidate_join_code(db_session.join_code)
     return db_session
 
 @router.post("/sessions/{session_id}/end")
@@ -61,9 +64,5 @@ def end_session(
     if not db_session:
         raise HTTPException(404)
 
-    db_session.is_active = False
-    db_session.end_time = datetime.utcnow()
-
-    session.add(db_session)
-    session.commit()
+    close_session(session, db_session)
     return {"status": "ended"}
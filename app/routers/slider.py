@@ -16,6 +16,7 @@ from app.models import Metric, Module, Hero
 from app.models.slider import SliderCreate, SliderPublic, Slider
 
 from app.models.session import Session, SessionDep
+from app.join_code import resolve_join_code, invalidate_module
 
 router = APIRouter(prefix="/modules", tags=["Sliders"])
 
@@ -38,6 +39,7 @@ def create_slider(
     session.add(slider)
     session.commit()
     session.refresh(slider)
+    invalidate_module(module_id)
 
     return slider
 
@@ -57,18 +59,12 @@ def get_sliders(
     join_code: str,
     session: SessionDep
 ):
-    db_session: Session = session.exec(select(Session).where(Session.join_code == join_code)).first()
-    if not db_session:
+    entry = resolve_join_code(join_code, session)
+    if not entry:
         raise HTTPException(status_code=404, detail="Session not found")
-    module_id = db_session.module_id
-
-    db_module = session.exec(select(Module).where(Module.id == module_id)).first()
-    if not db_module:
-        raise HTTPException(status_code=404, detail="Module not found")
-    module_id = db_module.id
 
     sliders = session.exec(
-        select(Slider).where(Slider.module_id == module_id)
+        select(Slider).where(Slider.module_id == entry.module_id)
     ).all()
     sliders_public = []
     for slider in sliders:
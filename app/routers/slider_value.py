@@ -0,0 +1,111 @@
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
+from sqlmodel import SQLModel, Field, select
+
+from app.db import SessionDep, AsyncSessionDep
+from app.auth import CurrentActiveUserDI
+from datetime import datetime, timedelta, timezone
+from typing import Union, Annotated
+
+from sqlalchemy import func
+from app.models import Session, Module
+from app.models.slider import Slider, SliderValue, SliderValueCreate, SliderResult, SliderSessionResult
+from app.join_code import resolve_join_code_async
+from app.ingest import store_feedback_async
+from app.ratelimit import limit_feedback_rate
+from app.idempotency import claim_submission, idempotency_key, release_submission
+
+router = APIRouter(prefix="/feedback", tags=["Slider Values"])
+
+HISTOGRAM_BUCKETS = range(0, 11) # SliderValue.value is 0-10
+
+@router.post("/slider/{join_code}", dependencies=[Depends(limit_feedback_rate)])
+async def submit_slider_value(
+    join_code: str,
+    data: SliderValueCreate,
+    session: AsyncSessionDep,
+    key: Annotated[str | None, Depends(idempotency_key)]
+):
+    entry = await resolve_join_code_async(join_code, session)
+    if not entry or not entry.is_active:
+        raise HTTPException(status_code=404, detail="Session not found or inactive")
+
+    # sliders belong to the module of the session
+    if data.slider_id not in entry.slider_ids:
+        raise HTTPException(status_code=404, detail="Slider not found")
+
+    nonce = data.client_nonce or key
+    if not claim_submission("slider", data.slider_id, nonce):
+        return {"status": "ok"}
+
+    try:
+        await store_feedback_async(session, SliderValue, {
+            "slider_id": data.slider_id,
+            "session_id": entry.session_id,
+            "value": data.value,
+            "timestamp": datetime.utcnow(),
+            "client_nonce": nonce
+        })
+    except BaseException:
+        release_submission("slider", data.slider_id, nonce)
+        raise
+
+    return {"status": "ok"}
+
+@router.get(
+    "/modules/{module_id}/sliders/results",
+    response_model=list[SliderResult]
+)
+def get_slider_results(
+    module_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI
+):
+    module = session.get(Module, module_id)
+    if not module:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if module.user_id != user.username:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    return aggregate_slider_results(session, module_id)
+
+def aggregate_slider_results(session: SessionDep, module_id: int) -> list[SliderResult]:
+    # one grouped scan of (slider_id, session_id, value): at most 11 rows per slider and session
+    counts = (
+        select(SliderValue.slider_id, SliderValue.session_id, SliderValue.value, func.count().label("count"))
+        .join(Slider, Slider.id == SliderValue.slider_id)
+        .where(Slider.module_id == module_id)
+        .group_by(SliderValue.slider_id, SliderValue.session_id, SliderValue.value)
+        .subquery()
+    )
+    statement = (
+        select(Slider.id, Slider.text, counts.c.session_id, Session.start_time, counts.c.value, counts.c.count)
+        .outerjoin(counts, counts.c.slider_id == Slider.id)
+        .outerjoin(Session, Session.id == counts.c.session_id)
+        .where(Slider.module_id == module_id)
+        .order_by(Slider.id, Session.start_time, counts.c.session_id, counts.c.value)
+    )
+
+    results: dict[int, SliderResult] = {}
+    for slider_id, text, session_id, start_time, value, count in session.exec(statement):
+        result = results.get(slider_id)
+        if result is None:
+            result = SliderResult(slider_id=slider_id, text=text, histogram=[0 for _ in HISTOGRAM_BUCKETS])
+            results[slider_id] = result
+        if session_id is None:
+            continue
+        if not result.sessions or result.sessions[-1].session_id != session_id:
+            result.sessions.append(SliderSessionResult(session_id=session_id, start_time=start_time, average=0))
+        session_result = result.sessions[-1]
+        session_result.count += count
+        session_result.average += value * count # sum for now
+        result.histogram[value] += count
+        result.count += count
+        result.min = value if result.min is None else min(result.min, value)
+        result.max = value if result.max is None else max(result.max, value)
+
+    for result in results.values():
+        if result.count:
+            result.average = sum(value * count for value, count in enumerate(result.histogram)) / result.count
+        for session_result in result.sessions:
+            session_result.average /= session_result.count
+    return list(results.values())
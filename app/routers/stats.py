@@ -0,0 +1,43 @@
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
+
+from app.auth import CurrentActiveUserDI, user_cache
+from app.db import get_pool_stats
+from app.join_code import join_code_cache
+from app.ingest import feedback_buffer
+from app.hashing import hashing_executor
+from app.live import live_results
+from app.ratelimit import address_rate_limiter, feedback_rate_limiter
+from app.housekeeping import housekeeper
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("/cache")
+def get_cache_stats(user: CurrentActiveUserDI):
+    return {
+        "join_code": join_code_cache.stats(),
+        "user": user_cache.stats()
+    }
+
+@router.get("/ingest")
+def get_ingest_stats(user: CurrentActiveUserDI):
+    return feedback_buffer.stats()
+
+@router.get("/pool")
+def get_db_pool_stats(user: CurrentActiveUserDI):
+    return get_pool_stats()
+
+@router.get("/hashing")
+def get_hashing_stats(user: CurrentActiveUserDI):
+    return hashing_executor.stats()
+
+@router.get("/live")
+def get_live_stats(user: CurrentActiveUserDI):
+    return live_results.stats()
+
+@router.get("/ratelimit")
+def get_rate_limit_stats(user: CurrentActiveUserDI):
+    return {**feedback_rate_limiter.stats(), "address": address_rate_limiter.stats()}
+
+@router.get("/housekeeping")
+def get_housekeeping_stats(user: CurrentActiveUserDI):
+    return housekeeper.stats()
@@ -1,10 +1,13 @@
-from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter
-from sqlmodel import SQLModel, Field, select
+from fastapi import Depends, FastAPI, HTTPException, status, Query, APIRouter, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import SQLModel, Field, Session as DBSession, select
+from sqlalchemy import tuple_
 
-from app.db import SessionDep
+from app.db import SessionDep, AsyncSessionDep, engine
 from app.auth import CurrentActiveUserDI
 from datetime import datetime, timedelta, timezone
-from typing import Union, Annotated
+from typing import Union, Annotated, Literal
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 
 from contextlib import asynccontextmanager
 
@@ -13,36 +16,65 @@ from jwt.exceptions import InvalidTokenError
 
 from pydantic import BaseModel
 from app.models import Session, Metric, Module, Hero
-from app.models.text_feedback import TextFeedback, TextFeedbackCreate, TextFeedbackPublic
+from app.models.text_feedback import TextFeedback, TextFeedbackCluster, TextFeedbackClusterPublic, TextFeedbackCreate, TextFeedbackPublic, TextFeedbackSearchHit
+from app.search import search_text_feedback
+from app.join_code import resolve_join_code_async
+from app.ingest import store_feedback_async
+from app.ratelimit import limit_feedback_rate
+from app.live import live_results
 
 router = APIRouter(prefix="/feedback", tags=["Text Feedback"])
 
-@router.post("/text/{join_code}")
-def submit_text_feedback(
+@router.post("/text/{join_code}", dependencies=[Depends(limit_feedback_rate)])
+async def submit_text_feedback(
     join_code: str,
     data: TextFeedbackCreate,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
-    db_session = session.exec(
-        select(Session).where(
-            Session.join_code == join_code,
-            Session.is_active == True
-        )
-    ).first()
-
-    if not db_session:
+    entry = await resolve_join_code_async(join_code, session)
+    if not entry or not entry.is_active:
         raise HTTPException(status_code=404, detail="Session not found or inactive")
 
-    feedback = TextFeedback(
-        session_id=db_session.id,
-        content=data.content
-    )
-
-    session.add(feedback)
-    session.commit()
+    # a live snapshot loading meanwhile can't tell whether it has this submission (app/routers/live.py)
+    with live_results.writing(entry.session_id):
+        await store_feedback_async(session, TextFeedback, {
+            "session_id": entry.session_id,
+            "content": data.content,
+            "timestamp": datetime.utcnow()
+        })
+        live_results.publish_text_feedback(entry.session_id)
 
     return {"status": "received"}
 
+def encode_cursor(timestamp: datetime, feedback_id: int) -> str:
+    return urlsafe_b64encode(f"{timestamp.isoformat()}|{feedback_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        timestamp, feedback_id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(feedback_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def text_feedback_statement(session_id: int, cursor: str | None, cluster_id: int | None = None):
+    statement = (
+        select(TextFeedback)
+        .where(TextFeedback.session_id == session_id)
+        .order_by(TextFeedback.timestamp, TextFeedback.id)
+    )
+    if cluster_id is not None:
+        statement = statement.where(TextFeedback.cluster_id == cluster_id)
+    if cursor:
+        statement = statement.where(tuple_(TextFeedback.timestamp, TextFeedback.id) > decode_cursor(cursor))
+    return statement
+
+def stream_text_feedback(statement):
+    # own DB session, it has to stay open until the last row is sent;
+    # yield_per fetches through a server side cursor in chunks
+    with DBSession(engine) as session:
+        for feedback in session.exec(statement.execution_options(yield_per=500)):
+            yield TextFeedbackPublic.model_validate(feedback).model_dump_json() + "\n"
+
 @router.get(
     "/sessions/{session_id}/text-feedback",
     response_model=list[TextFeedbackPublic]
@@ -50,10 +82,63 @@ def submit_text_feedback(
 def get_text_feedback(
     session_id: int,
     session: SessionDep,
-    user: CurrentActiveUserDI
+    user: CurrentActiveUserDI,
+    response: Response,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    format: Literal["json", "ndjson"] = "json",
+    cluster_id: int | None = None
 ):
-    feedback = session.exec(
-        select(TextFeedback).where(TextFeedback.session_id == session_id)
-    ).all()
+    # json: one page ordered by (timestamp, id), the next page's cursor is in X-Next-Cursor
+    # ndjson: everything after the cursor, streamed one object per line
+    # cluster_id: only the raw comments of one cluster
+    statement = text_feedback_statement(session_id, cursor, cluster_id)
+    if format == "ndjson":
+        return StreamingResponse(stream_text_feedback(statement), media_type="application/x-ndjson")
+
+    feedback = session.exec(statement.limit(limit + 1)).all()
+    if len(feedback) > limit:
+        feedback = feedback[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(feedback[-1].timestamp, feedback[-1].id)
 
     return feedback
+
+@router.get(
+    "/sessions/{session_id}/text-feedback/clusters",
+    response_model=list[TextFeedbackClusterPublic]
+)
+def get_text_feedback_clusters(
+    session_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100
+):
+    # repeated comments collapsed, most frequent first
+    return session.exec(
+        select(TextFeedbackCluster)
+        .where(TextFeedbackCluster.session_id == session_id)
+        .order_by(TextFeedbackCluster.count.desc(), TextFeedbackCluster.last_seen.desc(), TextFeedbackCluster.id)
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+@router.get(
+    "/modules/{module_id}/text-feedback/search",
+    response_model=list[TextFeedbackSearchHit]
+)
+def search_module_text_feedback(
+    module_id: int,
+    session: SessionDep,
+    user: CurrentActiveUserDI,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=200)] = 50
+):
+    # search the comments of all sessions of a module, best match first
+    module = session.get(Module, module_id)
+    if not module:
+        raise HTTPException(status_code=404, detail="Module not found")
+    if module.user_id != user.username:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    return search_text_feedback(session, module_id, q, limit)
@@ -0,0 +1,72 @@
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlmodel import SQLModel
+
+from app.config import settings
+from app.db import engine
+import app.models # noqa: F401  (registers the tables on SQLModel.metadata)
+import app.models.slider # noqa: F401
+import app.auth # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_REVISION = "0001" # schema created by create_all before there were migrations
+
+
+def alembic_config() -> Config:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    config.attributes["skip_logging_config"] = True
+    return config
+
+
+def find_schema_problems() -> list[str]:
+    # tables and indexes the models declare but the database doesn't have
+    problems = []
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                problems.append(f"missing table {table.name}")
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    problems.append(f"missing index {index.name} on {table.name}")
+    return problems
+
+
+def prepare_database():
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with engine.connect() as connection:
+        has_tables = bool(inspect(connection).get_table_names())
+        current = MigrationContext.configure(connection).get_current_revision()
+
+    if not has_tables:
+        # fresh database: build it from the migrations
+        command.upgrade(config, "head")
+        return
+
+    if current != head:
+        if settings.db_auto_migrate:
+            if current is None:
+                command.stamp(config, BASELINE_REVISION)
+            command.upgrade(config, "head")
+        elif current is None:
+            logger.warning(
+                "database has no migration history, run `alembic stamp %s && alembic upgrade head`",
+                BASELINE_REVISION
+            )
+        else:
+            logger.warning("database is at revision %s, head is %s; run `alembic upgrade head`", current, head)
+
+    for problem in find_schema_problems():
+        logger.warning("schema check: %s", problem)
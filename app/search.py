@@ -0,0 +1,85 @@
+import html
+import re
+
+from sqlalchemy import literal_column
+from sqlmodel import func, select
+
+from app.db import SessionDep
+from app.models import Session, TextFeedback
+from app.models.text_feedback import TextFeedbackSearchHit
+
+# Full text search over the text feedback of a module. On Postgres it uses the
+# generated tsvector column + GIN index from migration 0004 and ranks with
+# ts_rank; on SQLite (tests, local runs) it falls back to LIKE + ranking in Python.
+# Highlighting is done here for both, on the already escaped content, so
+# `highlighted` is safe to render as HTML.
+
+SEARCH_CONFIG = "simple" # must match the configuration of the generated column
+
+def search_terms(query: str) -> list[str]:
+    # the words websearch_to_tsquery matches on, without its operators
+    return [term for term in re.findall(r"\w+", query.lower()) if term != "or"]
+
+def highlight(content: str, terms: list[str]) -> str:
+    if not terms:
+        return html.escape(content)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE)
+    parts = []
+    position = 0
+    for match in pattern.finditer(content):
+        parts.append(html.escape(content[position:match.start()]))
+        parts.append("<mark>" + html.escape(match.group(0)) + "</mark>")
+        position = match.end()
+    parts.append(html.escape(content[position:]))
+    return "".join(parts)
+
+def search_text_feedback(session: SessionDep, module_id: int, query: str, limit: int) -> list[TextFeedbackSearchHit]:
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if session.get_bind().dialect.name == "postgresql":
+        rows = search_postgresql(session, module_id, query, limit)
+    else:
+        rows = search_fallback(session, module_id, terms, limit)
+    return [
+        TextFeedbackSearchHit(
+            id=feedback_id,
+            session_id=session_id,
+            content=content,
+            timestamp=timestamp,
+            rank=rank,
+            highlighted=highlight(content, terms)
+        )
+        for feedback_id, session_id, content, timestamp, rank in rows
+    ]
+
+def search_postgresql(session: SessionDep, module_id: int, query: str, limit: int):
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    content_tsv = literal_column("textfeedback.content_tsv")
+    rank = func.ts_rank(content_tsv, tsquery)
+    statement = (
+        select(TextFeedback.id, TextFeedback.session_id, TextFeedback.content, TextFeedback.timestamp, rank)
+        .join(Session, Session.id == TextFeedback.session_id)
+        .where(Session.module_id == module_id, content_tsv.op("@@")(tsquery))
+        .order_by(rank.desc(), TextFeedback.timestamp.desc())
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+def search_fallback(session: SessionDep, module_id: int, terms: list[str], limit: int):
+    statement = (
+        select(TextFeedback.id, TextFeedback.session_id, TextFeedback.content, TextFeedback.timestamp)
+        .join(Session, Session.id == TextFeedback.session_id)
+        .where(Session.module_id == module_id)
+        .where(*[func.lower(TextFeedback.content).contains(term, autoescape=True) for term in terms])
+        .order_by(TextFeedback.timestamp.desc())
+    )
+    hits = []
+    for feedback_id, session_id, content, timestamp in session.exec(statement):
+        words = re.findall(r"\w+", content.lower())
+        if not all(term in words for term in terms):
+            continue # LIKE also matches inside other words
+        rank = sum(words.count(term) for term in terms) / len(words)
+        hits.append((feedback_id, session_id, content, timestamp, rank))
+    hits.sort(key=lambda hit: hit[4], reverse=True) # stable, newest first on equal rank
+    return hits[:limit]
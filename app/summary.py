@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import func, select
+
+from app.config import settings
+from app.db import SessionDep, dialect_insert
+from app.ingest import feedback_buffer
+from app.join_code import invalidate_join_code
+from app.models import Question, QuestionResponse, Session, TextFeedback
+from app.models.slider import Slider, SliderValue
+from app.models.summary import MetricSummary, QuestionSummary, SessionAnalytics, SessionSummary, SliderSummary
+from app.routers.metric_value import aggregate_metric_results
+from app.routers.question_response import aggregate_question_results
+
+# Per session result snapshots for GET /modules/{id}/analytics. A snapshot is
+# written once when a session is closed; the results of an ended session don't
+# change any more, so the analytics view reads one row per session instead of
+# aggregating every session's feedback again.
+#
+# Submissions can still arrive shortly after a session ended: accepted by a
+# worker whose join code cache still says active, or waiting in that worker's
+# ingest buffer. A snapshot taken within SNAPSHOT_SETTLE of the end is taken
+# again by the next analytics request and only then reported as final.
+
+SNAPSHOT_SETTLE = timedelta(
+    seconds=settings.join_code_cache_ttl_seconds + settings.ingest_flush_interval_seconds
+)
+
+def compute_session_summary(session: SessionDep, session_id: int) -> SessionSummary:
+    metrics = [
+        MetricSummary(metric_id=result.metric_id, title=result.title, count=result.count, average=result.average)
+        for result in aggregate_metric_results(session, session_id)
+    ]
+    questions = [
+        QuestionSummary(
+            question_id=result.question_id,
+            text=result.text,
+            yes_count=result.yes_count,
+            no_count=result.no_count,
+            yes_ratio=result.yes_count / (result.yes_count + result.no_count) if result.yes_count + result.no_count else None
+        )
+        for result in aggregate_question_results(session, session_id)
+    ]
+    sliders = [
+        SliderSummary(slider_id=slider_id, text=text, count=count, average=average)
+        for slider_id, text, count, average in session.exec(
+            select(Slider.id, Slider.text, func.count(), func.avg(SliderValue.value))
+            .join(SliderValue, SliderValue.slider_id == Slider.id)
+            .where(SliderValue.session_id == session_id)
+            .group_by(Slider.id, Slider.text)
+            .order_by(Slider.id)
+        )
+    ]
+    text_feedback_count = session.exec(
+        select(func.count()).select_from(TextFeedback).where(TextFeedback.session_id == session_id)
+    ).one()
+    devices = session.exec(
+        select(func.count(func.distinct(QuestionResponse.device_token)))
+        .join(Question, Question.id == QuestionResponse.question_id)
+        .where(Question.session_id == session_id)
+    ).one()
+
+    # participants: the devices that answered. Metric and slider values are sent
+    # again and again during a lecture and say nothing about people; a question
+    # has one answer per device, so its answer count is a lower bound as well
+    answers = [summary.yes_count + summary.no_count for summary in questions]
+    participants = max([devices, *answers])
+
+    return SessionSummary(
+        session_id=session_id,
+        computed_at=datetime.utcnow(),
+        participants=participants,
+        text_feedback_count=text_feedback_count,
+        metrics=[summary.model_dump() for summary in metrics],
+        sliders=[summary.model_dump() for summary in sliders],
+        questions=[summary.model_dump() for summary in questions]
+    )
+
+def store_session_summary(session: SessionDep, summary: SessionSummary):
+    # upsert, closing a session twice (or a concurrent close) keeps one snapshot
+    row = summary.model_dump()
+    statement = dialect_insert(session, SessionSummary).values(row)
+    statement = statement.on_conflict_do_update(
+        index_elements=["session_id"],
+        set_={name: value for name, value in row.items() if name != "session_id"}
+    )
+    session.execute(statement)
+
+def close_session(session: SessionDep, db_session: Session):
+    # ends a session and snapshots its results; shared by POST /sessions/{id}/end
+    # and the idle session expiry
+    db_session.is_active = False
+    db_session.end_time = datetime.utcnow()
+    session.add(db_session)
+    session.commit()
+    # from here on this process rejects new submissions for the session
+    invalidate_join_code(db_session.join_code)
+
+    if feedback_buffer.enabled:
+        # buffered submissions of this session have to be in the snapshot,
+        # including a batch the flusher is writing right now
+        feedback_buffer.flush()
+    store_session_summary(session, compute_session_summary(session, db_session.id))
+    session.commit()
+
+def get_module_analytics(session: SessionDep, module_id: int) -> list[SessionAnalytics]:
+    rows = session.exec(
+        select(Session, SessionSummary)
+        .outerjoin(SessionSummary, SessionSummary.session_id == Session.id)
+        .where(Session.module_id == module_id)
+        .order_by(Session.start_time, Session.id)
+    ).all()
+
+    analytics = []
+    stored = False
+    for db_session, summary in rows:
+        ended = not db_session.is_active
+        settled = (db_session.end_time or datetime.min) + SNAPSHOT_SETTLE
+        if summary is None or not ended or summary.computed_at < settled:
+            summary = compute_session_summary(session, db_session.id)
+            if ended:
+                # ended before snapshots existed, or the snapshot may miss late submissions
+                store_session_summary(session, summary)
+                stored = True
+        final = ended and summary.computed_at >= settled
+        analytics.append(SessionAnalytics(
+            session_id=db_session.id,
+            start_time=db_session.start_time,
+            end_time=db_session.end_time,
+            is_active=db_session.is_active,
+            final=final,
+            participants=summary.participants,
+            text_feedback_count=summary.text_feedback_count,
+            metrics=summary.metrics,
+            sliders=summary.sliders,
+            questions=summary.questions
+        ))
+    if stored:
+        session.commit()
+    return analytics
@@ -0,0 +1,211 @@
+# Classroom burst load test: a lecture full of students joining at once.
+#
+#   python -m benchmarks.classroom_burst [--students 300] [--rounds 3] [--concurrency 100]
+#   python -m benchmarks.classroom_burst --database-url postgresql://user@localhost/bench
+#
+# Runs the app in process (httpx.ASGITransport, with its lifespan) against a
+# fresh SQLite file by default or the given database, which is migrated and
+# written to. Seeds a professor, a module with sliders, a session with metrics
+# and questions, then every student joins by code, gets a device token and
+# submits rounds of metric values, slider values, Yes/No swipes and a comment
+# while the professor polls the results. Reports per endpoint: requests,
+# errors, p50/p99/max latency, requests per second over the burst and SQL
+# statements per request (X-DB-Query-Count).
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Recorder:
+
+    def __init__(self, client, concurrency: int):
+        self.client = client
+        self.slots = asyncio.Semaphore(concurrency)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, label: str, method: str, url: str, **kwargs):
+        # label: the route template, so all students' requests land in one row
+        async with self.slots:
+            started = time.perf_counter()
+            response = await self.client.request(method, url, **kwargs)
+            self.latencies[label].append(time.perf_counter() - started)
+        if "x-db-query-count" in response.headers:
+            self.queries[label].append(int(response.headers["x-db-query-count"]))
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def report(self, seconds: float) -> list[dict]:
+        rows = []
+        for label, latencies in sorted(self.latencies.items()):
+            rows.append({
+                "endpoint": label,
+                "requests": len(latencies),
+                "errors": self.errors[label],
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "max_ms": max(latencies) * 1000,
+                "requests_per_second": len(latencies) / seconds,
+                "queries_per_request": statistics.mean(self.queries[label]) if self.queries[label] else None,
+            })
+        return rows
+
+
+async def seed(recorder: Recorder, metrics: int, questions: int, sliders: int) -> dict:
+    client = recorder.client
+    await client.post("/users", json={"username": "bench", "plain_password": "bench"})
+    token = (await client.post("/token", data={"username": "bench", "password": "bench"})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    module = (await client.post("/modules/", json={"title": "Benchmark"}, headers=headers)).json()
+    slider_ids = [
+        (await client.post(f"/modules/{module['id']}/sliders", json={"text": f"Slider {i}"}, headers=headers)).json()["id"]
+        for i in range(sliders)
+    ]
+    session = (await client.post(f"/modules/{module['id']}/sessions/start", headers=headers)).json()
+    metric_ids = [
+        (await client.post(f"/sessions/{session['id']}/metrics", json={"title": f"Metric {i}"}, headers=headers)).json()["id"]
+        for i in range(metrics)
+    ]
+    question_ids = [
+        (await client.post(f"/sessions/{session['id']}/questions", json={"text": f"Question {i}?"}, headers=headers)).json()["id"]
+        for i in range(questions)
+    ]
+    return {
+        "headers": headers,
+        "session_id": session["id"],
+        "join_code": session["join_code"],
+        "metric_ids": metric_ids,
+        "question_ids": question_ids,
+        "module_id": module["id"],
+        "slider_ids": slider_ids,
+    }
+
+
+async def student(recorder: Recorder, seeded: dict, number: int, rounds: int):
+    code = seeded["join_code"]
+    # own User-Agent: the rate limiter tells clients apart by address + User-Agent
+    headers = {"User-Agent": f"classroom-burst student {number}"}
+    await recorder.request("GET /join/{code}", "GET", f"/join/{code}", headers=headers)
+    device = await recorder.request("POST /join/{code}/device", "POST", f"/join/{code}/device", headers=headers)
+    device_headers = {**headers, "X-Device-Token": device.json().get("device_token", "")}
+
+    for _ in range(rounds):
+        for metric_id in seeded["metric_ids"]:
+            await recorder.request(
+                "POST /feedback/metric/{code}", "POST", f"/feedback/metric/{code}",
+                json={"metric_id": metric_id, "value": random.randint(0, 10)}, headers=headers
+            )
+        for slider_id in seeded["slider_ids"]:
+            await recorder.request(
+                "POST /feedback/slider/{code}", "POST", f"/feedback/slider/{code}",
+                json={"slider_id": slider_id, "value": random.randint(0, 10)}, headers=headers
+            )
+        for question_id in seeded["question_ids"]:
+            await recorder.request(
+                "POST /feedback/question/{code}", "POST", f"/feedback/question/{code}",
+                json={"question_id": question_id, "answer": random.random() < 0.5}, headers=device_headers
+            )
+        await recorder.request(
+            "POST /feedback/text/{code}", "POST", f"/feedback/text/{code}",
+            json={"content": random.choice(["too fast", "Too fast!", "+1", "can you repeat that?", f"question {number}"])},
+            headers=headers
+        )
+
+
+async def professor(recorder: Recorder, seeded: dict, interval: float, done: asyncio.Event):
+    # the dashboard keeps polling while the students submit
+    session_id = seeded["session_id"]
+    headers = seeded["headers"]
+    while not done.is_set():
+        await asyncio.gather(
+            recorder.request("GET /feedback/sessions/{id}/metrics/results", "GET", f"/feedback/sessions/{session_id}/metrics/results", headers=headers),
+            recorder.request("GET /feedback/sessions/{id}/metrics/timeline", "GET", f"/feedback/sessions/{session_id}/metrics/timeline", headers=headers),
+            recorder.request("GET /feedback/sessions/{id}/questions/results", "GET", f"/feedback/sessions/{session_id}/questions/results", headers=headers),
+            recorder.request("GET /feedback/sessions/{id}/text-feedback", "GET", f"/feedback/sessions/{session_id}/text-feedback", headers=headers),
+            recorder.request("GET /feedback/modules/{id}/sliders/results", "GET", f"/feedback/modules/{seeded['module_id']}/sliders/results", headers=headers),
+            recorder.request("GET /feedback/sessions/{id}/text-feedback/clusters", "GET", f"/feedback/sessions/{session_id}/text-feedback/clusters", headers=headers),
+        )
+        try:
+            await asyncio.wait_for(done.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> tuple[list[dict], float]:
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            recorder = Recorder(client, args.concurrency)
+            seeded = await seed(recorder, args.metrics, args.questions, args.sliders)
+
+            done = asyncio.Event()
+            polling = asyncio.create_task(professor(recorder, seeded, args.poll_interval, done))
+            started = time.perf_counter()
+            await asyncio.gather(*[student(recorder, seeded, i, args.rounds) for i in range(args.students)])
+            elapsed = time.perf_counter() - started
+            done.set()
+            await polling
+    return recorder.report(elapsed), elapsed
+
+
+def print_report(rows: list[dict], elapsed: float):
+    print(f"{'endpoint':<52} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'req/s':>8} {'queries':>7}")
+    for row in rows:
+        queries = f"{row['queries_per_request']:.1f}" if row["queries_per_request"] is not None else "-"
+        print(
+            f"{row['endpoint']:<52} {row['requests']:>8} {row['errors']:>6} {row['p50_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['requests_per_second']:>8.1f} {queries:>7}"
+        )
+    total = sum(row["requests"] for row in rows)
+    print(f"{total} requests in {elapsed:.2f} s, {total / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a lecture of students submitting feedback at once")
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3, help="submissions of every metric/question per student")
+    parser.add_argument("--metrics", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=2)
+    parser.add_argument("--sliders", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight at most")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between result polls")
+    parser.add_argument("--database-url", default=None, help="default: a new SQLite file")
+    parser.add_argument("--ingest-mode", choices=["direct", "buffered"], default=None)
+    parser.add_argument("--rate-limit", action="store_true", help="turn the feedback rate limit on")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # app.config reads the environment on import
+    if args.database_url is None:
+        args.database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="classroom-burst-"), "bench.db")
+    os.environ["DATABASE_URL_INTERNAL"] = args.database_url
+    os.environ["DEBUG_QUERY_HEADERS"] = "true"
+    if args.ingest_mode:
+        os.environ["INGEST_MODE"] = args.ingest_mode
+    if args.rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "true"
+
+    rows, elapsed = asyncio.run(run(args))
+    print_report(rows, elapsed)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"arguments": vars(args), "seconds": elapsed, "endpoints": rows}, file, indent=2)
@@ -0,0 +1,79 @@
+# Overhead of the feedback rate limiter on the request path.
+#
+#   python -m benchmarks.ratelimit_overhead [--iterations 200000]
+#
+# Times the in-memory token bucket for one hot client and for many distinct
+# clients (bucket creation + LRU eviction), and the complete dependency
+# (fingerprint + bucket) as it runs for every POST /feedback/*/{join_code}.
+
+import argparse
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from app.ratelimit import MemoryRateLimitBackend, RateLimiter, client_fingerprint, limit_feedback_rate, feedback_rate_limiter
+
+
+def timed(label: str, iterations: int, fn):
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed / iterations * 1e6:8.2f} µs/call  {iterations / elapsed:12,.0f} calls/s")
+
+
+def timed_async(label: str, iterations: int, fn):
+    async def calls():
+        started = time.perf_counter()
+        for i in range(iterations):
+            await fn(i)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(calls())
+    print(f"{label:<40} {elapsed / iterations * 1e6:8.2f} µs/call  {iterations / elapsed:12,.0f} calls/s")
+
+
+def make_request(i: int) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/feedback/metric/ABC123",
+        "headers": [(b"user-agent", f"Mozilla/5.0 client {i % 500}".encode())],
+        "client": (f"10.0.{i % 250}.{i % 200}", 50000),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the feedback rate limiter")
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    # effectively unlimited, so every call takes the same (allowed) path
+    limiter = RateLimiter(MemoryRateLimitBackend(maxsize=100000), rate=1e9, burst=10**9)
+    timed("bucket, one client", n, lambda i: limiter.check("ABC123:client"))
+    timed("bucket, distinct clients", n, lambda i: limiter.check(f"ABC123:{i}"))
+
+    small = RateLimiter(MemoryRateLimitBackend(maxsize=1000), rate=1e9, burst=10**9)
+    timed("bucket, distinct clients + eviction", n, lambda i: small.check(f"ABC123:{i}"))
+
+    requests = [make_request(i) for i in range(1000)]
+    timed("client_fingerprint", n, lambda i: client_fingerprint(requests[i % 1000]))
+
+    # the limiter is off by default: turn it on (effectively unlimited) for the run
+    saved = (feedback_rate_limiter.backend, feedback_rate_limiter.rate, feedback_rate_limiter.burst, feedback_rate_limiter.enabled)
+    feedback_rate_limiter.backend = MemoryRateLimitBackend(maxsize=100000)
+    feedback_rate_limiter.rate, feedback_rate_limiter.burst = 1e9, 10**9
+    feedback_rate_limiter.enabled = True
+    try:
+        # no device token, so the dependency never needs its database session
+        timed_async(
+            "limit_feedback_rate (dependency)", n,
+            lambda i: limit_feedback_rate("ABC123", requests[i % 1000], None)
+        )
+    finally:
+        (
+            feedback_rate_limiter.backend, feedback_rate_limiter.rate,
+            feedback_rate_limiter.burst, feedback_rate_limiter.enabled
+        ) = saved
@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlmodel import SQLModel
+
+from app.db import engine
+import app.models # noqa: F401  (registers all tables on SQLModel.metadata)
+import app.models.slider # noqa: F401
+import app.auth # noqa: F401  (UserInDB)
+
+config = context.config
+
+# the app runs migrations at startup with its own logging already configured
+if config.config_file_name is not None and not config.attributes.get("skip_logging_config"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = SQLModel.metadata
+
+# database objects that only exist in migrations (Postgres full text search),
+# autogenerate must not try to drop them
+UNMANAGED = {"content_tsv", "ix_textfeedback_content_tsv"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return name not in UNMANAGED
+
+
+def run_migrations_offline():
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,143 @@
+"""baseline: schema as created by SQLModel.metadata.create_all before migrations
+
+Existing databases already have these tables; mark them with
+`alembic stamp 0001` (the app does this itself with DB_AUTO_MIGRATE=true).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "userindb",
+        sa.Column("username", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("full_name", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("disabled", sa.Boolean(), nullable=True),
+        sa.Column("hashed_password", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("username"),
+    )
+    op.create_index("ix_userindb_username", "userindb", ["username"])
+
+    op.create_table(
+        "hero",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("secret_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_hero_name", "hero", ["name"])
+    op.create_index("ix_hero_age", "hero", ["age"])
+
+    op.create_table(
+        "module",
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["userindb.username"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "session",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("module_id", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("join_code", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["module_id"], ["module.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_session_join_code", "session", ["join_code"], unique=True)
+
+    op.create_table(
+        "slider",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("module_id", sa.Integer(), nullable=False),
+        sa.Column("text", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(["module_id"], ["module.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_slider_module_id", "slider", ["module_id"])
+
+    op.create_table(
+        "metric",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "metricvalue",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("metric_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["metric_id"], ["metric.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "question",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("text", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_question_session_id", "question", ["session_id"])
+
+    op.create_table(
+        "questionresponse",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("answer", sa.Boolean(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["question_id"], ["question.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_questionresponse_question_id", "questionresponse", ["question_id"])
+
+    op.create_table(
+        "textfeedback",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("content", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_textfeedback_session_id", "textfeedback", ["session_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("textfeedback")
+    op.drop_table("questionresponse")
+    op.drop_table("question")
+    op.drop_table("metricvalue")
+    op.drop_table("metric")
+    op.drop_table("slider")
+    op.drop_table("session")
+    op.drop_table("module")
+    op.drop_table("hero")
+    op.drop_table("userindb")
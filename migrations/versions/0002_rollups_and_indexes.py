@@ -0,0 +1,96 @@
+"""rollup tables, timeline index and missing foreign key / lookup indexes
+
+The rollup tables and the (metric_id, timestamp) index may already exist on
+databases where create_all ran with the new models, so they are only created
+(and the rollups filled from the existing feedback) when missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def has_table(name: str) -> bool:
+    if op.get_context().as_sql: # offline (--sql): nothing to inspect
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_index(table: str, name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade() -> None:
+    if not has_table("metricvaluerollup"):
+        op.create_table(
+            "metricvaluerollup",
+            sa.Column("metric_id", sa.Integer(), nullable=False),
+            sa.Column("value", sa.Integer(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["metric_id"], ["metric.id"]),
+            sa.PrimaryKeyConstraint("metric_id", "value"),
+        )
+        op.execute(
+            "INSERT INTO metricvaluerollup (metric_id, value, count) "
+            "SELECT metric_id, value, count(*) FROM metricvalue GROUP BY metric_id, value"
+        )
+    if not has_table("questionresponserollup"):
+        op.create_table(
+            "questionresponserollup",
+            sa.Column("question_id", sa.Integer(), nullable=False),
+            sa.Column("yes_count", sa.Integer(), nullable=False),
+            sa.Column("no_count", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["question_id"], ["question.id"]),
+            sa.PrimaryKeyConstraint("question_id"),
+        )
+        op.execute(
+            "INSERT INTO questionresponserollup (question_id, yes_count, no_count) "
+            "SELECT question_id, "
+            "sum(CASE WHEN answer THEN 1 ELSE 0 END), sum(CASE WHEN answer THEN 0 ELSE 1 END) "
+            "FROM questionresponse GROUP BY question_id"
+        )
+
+    # metric_id lookups on metricvalue use the leading column of this index,
+    # a separate single column index would only slow down inserts
+    if not has_index("metricvalue", "ix_metricvalue_metric_id_timestamp"):
+        # metricvalue is the big table, don't block submissions while building the index
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_metricvalue_metric_id_timestamp",
+                "metricvalue",
+                ["metric_id", "timestamp"],
+                postgresql_concurrently=True,
+            )
+
+    op.create_index("ix_metric_session_id", "metric", ["session_id"])
+    op.create_index("ix_session_module_id_is_active", "session", ["module_id", "is_active"])
+    op.create_index(
+        "ix_session_join_code_active",
+        "session",
+        ["join_code"],
+        postgresql_where=sa.text("is_active"),
+        sqlite_where=sa.text("is_active"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_session_join_code_active", table_name="session")
+    op.drop_index("ix_session_module_id_is_active", table_name="session")
+    op.drop_index("ix_metric_session_id", table_name="metric")
+    op.drop_index("ix_metricvalue_metric_id_timestamp", table_name="metricvalue")
+    op.drop_table("questionresponserollup")
+    op.drop_table("metricvaluerollup")
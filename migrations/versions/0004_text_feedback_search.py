@@ -0,0 +1,48 @@
+"""full text search over text feedback (Postgres only)
+
+Adds a generated tsvector column and a GIN index on it. Both are managed
+here only, the SQLModel model doesn't declare them (see UNMANAGED in env.py);
+SQLite databases use the LIKE fallback in app/search.py instead.
+Adding a stored generated column rewrites textfeedback once.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # 'simple': no stemming or stop words, lectures are held in German and English
+    op.execute(
+        "ALTER TABLE textfeedback ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_textfeedback_content_tsv",
+            "textfeedback",
+            ["content_tsv"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_textfeedback_content_tsv", table_name="textfeedback")
+    op.execute("ALTER TABLE textfeedback DROP COLUMN content_tsv")
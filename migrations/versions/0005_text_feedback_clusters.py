@@ -0,0 +1,56 @@
+"""text feedback clusters
+
+Existing comments keep cluster_id NULL until the clusters are built from them
+with `python -m app.clustering rebuild` (normalization lives in Python).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "textfeedbackcluster",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("fingerprint", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column("content", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("first_seen", sa.DateTime(), nullable=False),
+        sa.Column("last_seen", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("session_id", "fingerprint"),
+    )
+    # nullable column without default: no table rewrite on Postgres
+    with op.batch_alter_table("textfeedback") as batch_op:
+        batch_op.add_column(sa.Column("cluster_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_textfeedback_cluster_id", "textfeedbackcluster", ["cluster_id"], ["id"])
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_textfeedback_cluster_id",
+            "textfeedback",
+            ["cluster_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_textfeedback_cluster_id", table_name="textfeedback")
+    with op.batch_alter_table("textfeedback") as batch_op:
+        batch_op.drop_constraint("fk_textfeedback_cluster_id", type_="foreignkey")
+        batch_op.drop_column("cluster_id")
+    op.drop_table("textfeedbackcluster")
@@ -0,0 +1,49 @@
+"""client nonce for idempotent metric value / question response submissions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # nullable columns without default: no table rewrite on Postgres
+    op.add_column("metricvalue", sa.Column("client_nonce", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.add_column("questionresponse", sa.Column("client_nonce", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    # both tables take every submission, build the indexes without blocking them
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_metricvalue_metric_id_client_nonce",
+            "metricvalue",
+            ["metric_id", "client_nonce"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_questionresponse_question_id_client_nonce",
+            "questionresponse",
+            ["question_id", "client_nonce"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_questionresponse_question_id_client_nonce", table_name="questionresponse")
+    op.drop_index("ix_metricvalue_metric_id_client_nonce", table_name="metricvalue")
+    with op.batch_alter_table("questionresponse") as batch_op:
+        batch_op.drop_column("client_nonce")
+    with op.batch_alter_table("metricvalue") as batch_op:
+        batch_op.drop_column("client_nonce")
@@ -0,0 +1,39 @@
+"""one answer per device for question responses
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a constant default is stored in the catalog on Postgres 11+, no table rewrite
+    op.add_column("questionresponse", sa.Column("device_token", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=True))
+    op.add_column("questionresponse", sa.Column("answer_changes", sa.Integer(), server_default="0", nullable=False))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_questionresponse_question_id_device_token",
+            "questionresponse",
+            ["question_id", "device_token"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_questionresponse_question_id_device_token", table_name="questionresponse")
+    with op.batch_alter_table("questionresponse") as batch_op:
+        batch_op.drop_column("answer_changes")
+        batch_op.drop_column("device_token")
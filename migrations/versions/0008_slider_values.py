@@ -0,0 +1,40 @@
+"""slider values per slider and session
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "slidervalue",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("slider_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.SmallInteger(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("client_nonce", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.ForeignKeyConstraint(["slider_id"], ["slider.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_slidervalue_session_id", "slidervalue", ["session_id"])
+    op.create_index("ix_slidervalue_slider_id_client_nonce", "slidervalue", ["slider_id", "client_nonce"], unique=True)
+    op.create_index("ix_slidervalue_slider_id_session_id_value", "slidervalue", ["slider_id", "session_id", "value"])
+
+
+def downgrade() -> None:
+    op.drop_table("slidervalue")
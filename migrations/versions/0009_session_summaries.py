@@ -0,0 +1,40 @@
+"""result snapshots of ended sessions
+
+Sessions that ended before this revision get their snapshot the first time
+GET /modules/{id}/analytics is called for their module.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sessionsummary",
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.Column("participants", sa.Integer(), nullable=False),
+        sa.Column("text_feedback_count", sa.Integer(), nullable=False),
+        sa.Column("metrics", sa.JSON(), nullable=False),
+        sa.Column("sliders", sa.JSON(), nullable=False),
+        sa.Column("questions", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(["session_id"], ["session.id"]),
+        sa.PrimaryKeyConstraint("session_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sessionsummary")
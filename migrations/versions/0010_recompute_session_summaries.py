@@ -0,0 +1,28 @@
+"""recompute session snapshots with the new participants count
+
+participants used to include the submission count of the most used metric or
+slider. The stored snapshots are deleted; GET /modules/{id}/analytics takes
+them again the next time it is called for their module.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM sessionsummary")
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,33 @@
+import os
+import tempfile
+from itertools import count
+
+import pytest
+
+# the app reads its settings on import: point it at a throwaway sqlite database first
+os.environ["DATABASE_URL_INTERNAL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+usernames = count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    # the lifespan creates the tables
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def teacher(client):
+    # a new user with a module and a started session per test
+    username = f"teacher{next(usernames)}"
+    client.post("/users", json={"username": username, "plain_password": "pw"})
+    token = client.post("/token", data={"username": username, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    module = client.post("/modules/", json={"title": "Module"}, headers=headers).json()
+    session = client.post(f"/modules/{module['id']}/sessions/start", headers=headers).json()
+    return {"headers": headers, "module": module, "session": session}
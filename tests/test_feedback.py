@@ -0,0 +1,50 @@
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.idempotency import submission_window
+from app.models import MetricValue, QuestionResponseRollup
+from app.models.rollup import MetricValueRollup
+
+
+def test_retried_metric_value_is_stored_once(client, teacher):
+    session_id, join_code = teacher["session"]["id"], teacher["session"]["join_code"]
+    metric_id = client.post(f"/sessions/{session_id}/metrics", json={"title": "Pace"}, headers=teacher["headers"]).json()["id"]
+    submission = {"metric_id": metric_id, "value": 4, "client_nonce": "retry-1"}
+
+    assert client.post(f"/feedback/metric/{join_code}", json=submission).status_code == 200
+    # answered from the submission window
+    assert client.post(f"/feedback/metric/{join_code}", json=submission).status_code == 200
+    # a retry the window has forgotten is skipped by the unique index
+    submission_window.clear()
+    assert client.post(f"/feedback/metric/{join_code}", json=submission).status_code == 200
+
+    with Session(engine) as session:
+        assert len(session.exec(select(MetricValue).where(MetricValue.metric_id == metric_id)).all()) == 1
+        rollup = session.exec(select(MetricValueRollup).where(MetricValueRollup.metric_id == metric_id)).one()
+        assert (rollup.value, rollup.count) == (4, 1)
+
+
+def test_device_answer_change_moves_the_rollup_count(client, teacher):
+    session_id, join_code = teacher["session"]["id"], teacher["session"]["join_code"]
+    question_id = client.post(f"/sessions/{session_id}/questions", json={"text": "Clear?"}, headers=teacher["headers"]).json()["id"]
+    device_token = client.post(f"/join/{join_code}/device").json()["device_token"]
+
+    def answer(value: bool) -> tuple[int, int]:
+        response = client.post(
+            f"/feedback/question/{join_code}",
+            json={"question_id": question_id, "answer": value},
+            headers={"X-Device-Token": device_token}
+        )
+        assert response.status_code == 200
+        with Session(engine) as session:
+            rollup = session.get(QuestionResponseRollup, question_id)
+            return rollup.yes_count, rollup.no_count
+
+    assert answer(True) == (1, 0)
+    assert answer(False) == (0, 1)
+    # repeating the answer changes nothing
+    assert answer(False) == (0, 1)
+    assert answer(True) == (1, 0)
+    # an anonymous answer counts on its own
+    client.post(f"/feedback/question/{join_code}", json={"question_id": question_id, "answer": False})
+    assert answer(True) == (1, 1)
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+import app.ingest
+from app.db import engine
+from app.ingest import FeedbackBuffer
+from app.models import MetricValue
+
+
+def metric_value(metric_id: int | None, value: int) -> dict:
+    return {"metric_id": metric_id, "value": value, "timestamp": datetime.utcnow(), "client_nonce": None}
+
+
+def stored_values(metric_id: int) -> list[int]:
+    with Session(engine) as session:
+        return sorted(session.exec(select(MetricValue.value).where(MetricValue.metric_id == metric_id)).all())
+
+
+def create_metric(client, teacher) -> int:
+    session_id = teacher["session"]["id"]
+    return client.post(f"/sessions/{session_id}/metrics", json={"title": "Understanding"}, headers=teacher["headers"]).json()["id"]
+
+
+def test_flush_drops_only_the_row_that_cannot_be_written(client, teacher):
+    metric_id = create_metric(client, teacher)
+    buffer = FeedbackBuffer(batch_size=100, flush_interval=1, max_queue=1000, max_attempts=3)
+    buffer.enabled = True
+    buffer.put(MetricValue, metric_value(None, 1))
+    for value in range(10):
+        buffer.put(MetricValue, metric_value(metric_id, value))
+
+    buffer.flush()
+
+    assert stored_values(metric_id) == list(range(10))
+    stats = buffer.stats()
+    assert stats["queued"] == 0
+    assert stats["dropped_rows"] == 1
+    assert stats["flushed_rows"] == 10
+
+
+def test_flush_requeues_on_transient_errors_until_max_attempts(client, teacher, monkeypatch):
+    metric_id = create_metric(client, teacher)
+    buffer = FeedbackBuffer(batch_size=100, flush_interval=1, max_queue=1000, max_attempts=3)
+    buffer.enabled = True
+    for value in range(3):
+        buffer.put(MetricValue, metric_value(metric_id, value))
+
+    def database_away(*args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(app.ingest, "write_rows", database_away)
+    buffer.flush()
+    assert buffer.stats()["queued"] == 3
+    assert [attempts for _, _, _, attempts in buffer._queue] == [1, 1, 1]
+    buffer.flush()
+    buffer.flush()
+    assert buffer.stats()["queued"] == 0
+    assert buffer.stats()["dropped_rows"] == 3
+    assert buffer.stats()["failed_flushes"] == 3
+
+    # the database is back: nothing comes back from the dropped rows
+    monkeypatch.undo()
+    buffer.put(MetricValue, metric_value(metric_id, 7))
+    buffer.flush()
+    assert stored_values(metric_id) == [7]
+    assert buffer.stats()["flushed_rows"] == 1
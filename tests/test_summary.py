@@ -0,0 +1,43 @@
+from sqlmodel import Session
+
+from app.db import engine
+from app.summary import compute_session_summary
+
+
+def test_participants_count_devices_not_repeated_values(client, teacher):
+    headers = teacher["headers"]
+    module_id = teacher["module"]["id"]
+    session_id, join_code = teacher["session"]["id"], teacher["session"]["join_code"]
+    metric_id = client.post(f"/sessions/{session_id}/metrics", json={"title": "Understanding"}, headers=headers).json()["id"]
+    slider_id = client.post(f"/modules/{module_id}/sliders", json={"text": "Pace"}, headers=headers).json()["id"]
+    question_id = client.post(f"/sessions/{session_id}/questions", json={"text": "Clear?"}, headers=headers).json()["id"]
+
+    # three students send values over and over: that alone says nothing about people
+    for _ in range(5):
+        for student in range(3):
+            client.post(f"/feedback/metric/{join_code}", json={"metric_id": metric_id, "value": student})
+            client.post(f"/feedback/slider/{join_code}", json={"slider_id": slider_id, "value": student})
+    with Session(engine) as session:
+        assert compute_session_summary(session, session_id).participants == 0
+
+    # two of them answer with a device token, one of them twice
+    for student in range(2):
+        device_token = client.post(f"/join/{join_code}/device", headers={"User-Agent": f"student{student}"}).json()["device_token"]
+        for value in (True, False):
+            client.post(
+                f"/feedback/question/{join_code}",
+                json={"question_id": question_id, "answer": value},
+                headers={"X-Device-Token": device_token}
+            )
+    with Session(engine) as session:
+        assert compute_session_summary(session, session_id).participants == 2
+
+    # an answer without a device token is one more person on that question
+    client.post(f"/feedback/question/{join_code}", json={"question_id": question_id, "answer": True})
+    with Session(engine) as session:
+        summary = compute_session_summary(session, session_id)
+    assert summary.participants == 3
+    assert summary.questions[0]["yes_count"] + summary.questions[0]["no_count"] == 3
+
+    analytics = client.get(f"/modules/{module_id}/analytics", headers=headers).json()
+    assert [row["participants"] for row in analytics] == [3]